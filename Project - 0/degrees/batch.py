@@ -0,0 +1,111 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+import degrees
+
+# Settings for searches run in worker processes
+options = {"bidirectional": False}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees-of-separation queries at once. "
+                    "Each input line holds a source and a target, separated "
+                    "by a tab, given as person IDs or unambiguous names. "
+                    "Results are written as JSON lines."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("queries", nargs="?", type=argparse.FileType("r"),
+                        default=sys.stdin)
+    parser.add_argument("--workers", type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--bidirectional", action="store_true")
+    parser.add_argument("--tree-cache", type=int, metavar="MB",
+                        help="cache search trees of repeated sources/targets")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=args.compact, cache=args.cache)
+    print("Data loaded.", file=sys.stderr)
+    options["bidirectional"] = args.bidirectional
+    if args.tree_cache:
+        degrees.enable_tree_cache(args.tree_cache * 1024 * 1024)
+
+    start = time.perf_counter()
+    count = 0
+    for result in run(args.queries, args.workers):
+        print(json.dumps(result), flush=True)
+        count += 1
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0
+    print(f"{count} queries in {elapsed:.2f}s ({rate:.1f} queries/s)",
+          file=sys.stderr)
+
+
+def run(lines, workers):
+    """
+    Yields a result for each query line, in input order.
+
+    Worker processes are forked after the data is loaded, so they share
+    the parent's graph copy-on-write instead of loading their own.
+    """
+    queries = (parse(line) for line in lines if line.strip())
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        yield from map(answer, queries)
+        return
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        yield from pool.imap(answer, queries, chunksize=16)
+
+
+def parse(line):
+    """Splits a query line into its source and target fields."""
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) != 2:
+        return {"query": line.rstrip("\n"), "error": "expected source<TAB>target"}
+    return {"source": fields[0].strip(), "target": fields[1].strip()}
+
+
+def resolve(person):
+    """
+    Returns the person ID for an ID or unambiguous name, or raises
+    LookupError describing why it could not be resolved.
+    """
+    if person in degrees.people:
+        return person
+    person_ids = degrees.names.get(person.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    if not person_ids:
+        raise LookupError(f"person not found: {person}")
+    raise LookupError(f"ambiguous name: {person}")
+
+
+def answer(query):
+    """Answers one parsed query, returning a JSON-serializable result."""
+    if "error" in query:
+        return query
+    try:
+        source = resolve(query["source"])
+        target = resolve(query["target"])
+    except LookupError as e:
+        return dict(query, error=str(e))
+
+    path = degrees.shortest_path(source, target,
+                                 bidirectional=options["bidirectional"])
+    result = dict(query, source_id=source, target_id=target)
+    if path is None:
+        result["degrees"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [list(step) for step in path]
+    return result
+
+
+if __name__ == "__main__":
+    main()
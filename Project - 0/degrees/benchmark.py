@@ -0,0 +1,327 @@
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import degrees
+import landmarks
+import snapshot
+from ingest import Reader
+
+# Ways of loading the data compared by the load benchmark
+LOAD_MODES = ["dict", "compact", "cache-cold", "cache-warm"]
+
+# Search configurations compared by the query benchmark
+QUERY_MODES = [
+    "dict", "dict-bidirectional", "compact", "compact-bidirectional",
+    "landmarks", "landmarks-bidirectional", "tree-cache", "budgeted",
+]
+
+
+def write_stars(path, rows, people, movies):
+    """Writes a synthetic stars.csv with `rows` random credits."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("person_id,movie_id\n")
+        for _ in range(rows):
+            f.write(f"{random.randrange(people)},{random.randrange(movies)}\n")
+
+
+def dict_reader_rows(path):
+    """Counts rows the way load_data originally read them."""
+    count = 0
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row["person_id"], row["movie_id"]
+            count += 1
+    return count
+
+
+def reader_rows(path, workers, chunk_size):
+    count = 0
+    with Reader(workers, chunk_size) as reader:
+        for person_id, movie_id in reader.read(path, ("person_id", "movie_id")):
+            count += 1
+    return count
+
+
+def ingest(args):
+    """Reports rows/second parsing a synthetic multi-million-row stars.csv."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stars.csv")
+        print(f"Writing {args.rows} rows...")
+        write_stars(path, args.rows, args.rows // 4, args.rows // 8)
+
+        runs = [("DictReader", lambda: dict_reader_rows(path))]
+        for workers in args.workers:
+            runs.append((
+                f"Reader, {workers} worker(s)",
+                lambda workers=workers: reader_rows(path, workers, args.chunk_size)
+            ))
+        for label, run in runs:
+            start = time.perf_counter()
+            count = run()
+            elapsed = time.perf_counter() - start
+            print(f"{label:>24}: {count / elapsed:12,.0f} rows/s ({elapsed:.2f}s)")
+
+
+def peak_memory():
+    """Returns the peak resident memory of this process in MiB."""
+    # Only available on Unix
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 if sys.platform != "darwin" else peak / 1024 ** 2
+
+
+def load_once(args):
+    """Loads the data one way and prints the time and peak memory as JSON."""
+    start = time.perf_counter()
+    degrees.load_data(args.directory, compact=args.mode == "compact",
+                      cache=args.mode.startswith("cache"))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "peak_mb": peak_memory()}))
+
+
+def load(args):
+    """Reports load time and peak memory for each way of loading the data."""
+    print(f"{'mode':>12} {'seconds':>9} {'peak MiB':>9}")
+    for mode in args.modes:
+        if mode == "cache-cold":
+            try:
+                os.remove(snapshot.path_for(args.directory))
+            except FileNotFoundError:
+                pass
+        # Each mode runs in a fresh process so peak memory is its own
+        output = subprocess.run(
+            [sys.executable, __file__, "load-once", args.directory, mode],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output)
+        print(f"{mode:>12} {result['seconds']:9.2f} {result['peak_mb']:9.1f}")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+
+def query(args):
+    """Reports shortest_path latency percentiles by path length."""
+    random.seed(args.seed)
+    loaded = None
+    pairs = None
+    for mode in args.modes:
+        compact = not mode.startswith("dict")
+        if loaded != compact:
+            degrees.load_data(args.directory, compact=compact)
+            loaded = compact
+        if pairs is None:
+            # Drawn once, so every mode answers the same queries
+            component = sorted(
+                person_id for person_id in degrees.people
+                if degrees.components.component(person_id) == 0
+            )
+            pairs = [
+                (random.choice(component), random.choice(component))
+                for _ in range(args.queries)
+            ]
+
+        degrees.tree_cache = None
+        degrees.landmark_index = None
+        queries = pairs
+        if mode.startswith("landmarks"):
+            degrees.enable_landmarks(args.directory)
+        elif mode == "tree-cache":
+            degrees.enable_tree_cache(args.tree_cache * 1024 * 1024)
+            # Repeated sources are what the cache is for
+            sources = pairs[:max(1, len(pairs) // 20)]
+            queries = [(random.choice(sources)[0], t) for _, t in pairs]
+
+        latencies = defaultdict(list)
+        inexact = 0
+        for source, target in queries:
+            start = time.perf_counter()
+            if mode == "budgeted":
+                path, exact = degrees.budgeted_shortest_path(
+                    source, target, args.max_people, args.max_seconds,
+                    args.hub_size
+                )
+                inexact += not exact
+            else:
+                path = degrees.shortest_path(
+                    source, target, bidirectional=mode.endswith("bidirectional")
+                )
+            elapsed = time.perf_counter() - start
+            latencies[None if path is None else len(path)].append(elapsed)
+
+        print(f"{mode}:")
+        print(f"    {'degrees':>8} {'queries':>8} {'p50 ms':>9} "
+              f"{'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for length in sorted(latencies, key=lambda n: -1 if n is None else n):
+            values = latencies[length]
+            print(f"    {str(length):>8} {len(values):>8} "
+                  + " ".join(f"{percentile(values, p) * 1000:9.3f}"
+                             for p in (50, 90, 99, 100)))
+        if inexact:
+            print(f"    {inexact} of {len(queries)} answers unverified "
+                  "or given up")
+
+    start = time.perf_counter()
+    for source, _ in pairs:
+        degrees.neighbors_for_person(source)
+    elapsed = time.perf_counter() - start
+    print(f"neighbors_for_person: {elapsed / len(pairs) * 1000:.3f} ms/call")
+
+
+def read_rows(path):
+    """Returns the header and rows of a CSV file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    return rows[0], rows[1:]
+
+
+def write_rows(path, header, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def update(args):
+    """
+    Checks appending held-back people, movies and credits to loaded
+    data, then building a landmark index, against loading them all.
+    """
+    tables = {
+        name: read_rows(os.path.join(args.directory, f"{name}.csv"))
+        for name in ("people", "movies", "stars")
+    }
+    kept = {
+        name: len(tables[name][1]) - int(len(tables[name][1]) * args.held_back)
+        for name in ("people", "movies")
+    }
+    people_rows = tables["people"][1]
+    movie_rows = tables["movies"][1]
+    loaded_people = {row[0] for row in people_rows[:kept["people"]]}
+    loaded_movies = {row[0] for row in movie_rows[:kept["movies"]]}
+    stars_header, star_rows = tables["stars"]
+    loaded_stars = [row for row in star_rows
+                    if row[0] in loaded_people and row[1] in loaded_movies]
+    added_stars = [row for row in star_rows
+                   if row[0] not in loaded_people or row[1] not in loaded_movies]
+
+    degrees.load_data(args.directory)
+    rng = random.Random(args.seed)
+    ids = list(degrees.people)
+    pairs = [(rng.choice(ids), rng.choice(ids)) for _ in range(args.queries)]
+    expected = []
+    for source, target in pairs:
+        path = degrees.shortest_path(source, target, bidirectional=True)
+        expected.append(None if path is None else len(path))
+
+    print(f"{'mode':>8} {'added':>8} {'add s':>8} {'index s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        write_rows(os.path.join(directory, "people.csv"),
+                   tables["people"][0], people_rows[:kept["people"]])
+        write_rows(os.path.join(directory, "movies.csv"),
+                   tables["movies"][0], movie_rows[:kept["movies"]])
+        write_rows(os.path.join(directory, "stars.csv"),
+                   stars_header, loaded_stars)
+
+        for mode in ("dict", "compact", "cache"):
+            degrees.load_data(directory, compact=mode == "compact",
+                              cache=mode == "cache")
+            start = time.perf_counter()
+            for row in people_rows[kept["people"]:]:
+                degrees.add_person(*row)
+            for row in movie_rows[kept["movies"]:]:
+                degrees.add_movie(*row)
+            for person_id, movie_id in added_stars:
+                degrees.add_star(person_id, movie_id)
+            added = time.perf_counter() - start
+
+            # Build the index afresh rather than load the last mode's
+            if os.path.exists(landmarks.path_for(directory)):
+                os.remove(landmarks.path_for(directory))
+            start = time.perf_counter()
+            degrees.enable_landmarks(directory, args.landmarks)
+            indexed = time.perf_counter() - start
+
+            index = degrees.landmark_index
+            compact = index.graph
+            for landmark, distances in zip(index.landmarks, index.distances):
+                if list(distances) != list(compact.distances(landmark)):
+                    raise Exception(f"{mode}: stale landmark distances")
+            most = max(len(compact.movies_of(p))
+                       for p in range(len(compact.person_ids)))
+            if len(compact.movies_of(index.landmarks[0])) != most:
+                raise Exception(f"{mode}: landmarks ignore added credits")
+            for (source, target), length in zip(pairs, expected):
+                path = degrees.shortest_path(source, target, bidirectional=True)
+                if (None if path is None else len(path)) != length:
+                    raise Exception(f"{mode}: wrong path from {source} "
+                                    f"to {target}")
+
+            count = len(people_rows) - kept["people"] + len(added_stars)
+            print(f"{mode:>8} {count:>8} {added:8.2f} {indexed:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="degrees benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("load", help=load.__doc__)
+    command.add_argument("directory")
+    command.add_argument("--modes", nargs="+", choices=LOAD_MODES,
+                         default=LOAD_MODES)
+    command.set_defaults(run=load)
+
+    command = commands.add_parser("load-once")
+    command.add_argument("directory")
+    command.add_argument("mode", choices=LOAD_MODES)
+    command.set_defaults(run=load_once)
+
+    command = commands.add_parser("query", help=query.__doc__)
+    command.add_argument("directory")
+    command.add_argument("--queries", type=int, default=200)
+    command.add_argument("--modes", nargs="+", choices=QUERY_MODES,
+                         default=QUERY_MODES)
+    command.add_argument("--tree-cache", type=int, default=256, metavar="MB")
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--hub-size", type=int,
+                         help="cast size deferred by the budgeted mode")
+    command.add_argument("--max-people", type=int,
+                         help="cast members examined by the budgeted mode")
+    command.add_argument("--max-seconds", type=float,
+                         help="seconds allowed per budgeted query")
+    command.set_defaults(run=query)
+
+    command = commands.add_parser("ingest", help=ingest.__doc__)
+    command.add_argument("--rows", type=int, default=4_000_000)
+    command.add_argument("--workers", type=int, nargs="+",
+                         default=[1, 2, os.cpu_count() or 1])
+    command.add_argument("--chunk-size", type=int, default=8 * 1024 * 1024)
+    command.set_defaults(run=ingest)
+
+    command = commands.add_parser("update", help=update.__doc__)
+    command.add_argument("directory")
+    command.add_argument("--held-back", type=float, default=0.1,
+                         help="fraction of people and movies appended later")
+    command.add_argument("--landmarks", type=int, default=degrees.LANDMARKS)
+    command.add_argument("--queries", type=int, default=200)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=update)
+
+    args = parser.parse_args()
+    random.seed(0)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from array import array
+
+from graph import INDEX, writable
+
+
+class Components():
+    """
+    Connected components of the people graph, so whether two people are
+    connected at all is a single lookup.
+
+    `labels[p]` is the component of person index `p`, and `sizes[c]`
+    the number of people in component `c`. Components are numbered from
+    largest to smallest when labelled.
+
+    Components joined by credits added later are recorded in `merged`,
+    mapping a label to the label it was merged into, so no existing
+    labels need rewriting.
+    """
+
+    def __init__(self, person_index, labels, sizes):
+        self.person_index = person_index
+        self.labels = labels
+        self.sizes = sizes
+        self.merged = {}
+
+    @classmethod
+    def from_casts(cls, person_index, casts):
+        """
+        Labels components with union-find, given a mapping of person ID to
+        person index and an iterable of casts as sequences of person indices.
+        """
+        parent = array(INDEX, range(len(person_index)))
+
+        def find(p):
+            while parent[p] != p:
+                # Path halving keeps the trees shallow
+                parent[p] = parent[parent[p]]
+                p = parent[p]
+            return p
+
+        for cast in casts:
+            it = iter(cast)
+            first = next(it, None)
+            if first is None:
+                continue
+            root = find(first)
+            for p in it:
+                other = find(p)
+                if other != root:
+                    parent[other] = root
+
+        # Renumber roots densely, largest component first
+        roots = array(INDEX, (find(p) for p in range(len(parent))))
+        counts = {}
+        for root in roots:
+            counts[root] = counts.get(root, 0) + 1
+        order = sorted(counts, key=counts.get, reverse=True)
+        number = {root: c for c, root in enumerate(order)}
+        labels = array(INDEX, (number[root] for root in roots))
+        sizes = array(INDEX, (counts[root] for root in order))
+        return cls(person_index, labels, sizes)
+
+    @classmethod
+    def from_graph(cls, graph):
+        casts = (graph.stars_of(m) for m in range(len(graph.movie_ids)))
+        return cls.from_casts(graph.person_index, casts)
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Labels components of the `people` and `movies` dicts of degrees.py,
+        indexing people in dict order.
+        """
+        person_index = {person_id: i for i, person_id in enumerate(people)}
+        casts = (
+            [person_index[person_id] for person_id in movie["stars"]]
+            for movie in movies.values()
+        )
+        return cls.from_casts(person_index, casts)
+
+    def component(self, person_id):
+        label = self.labels[self.person_index[person_id]]
+        while label in self.merged:
+            label = self.merged[label]
+        return label
+
+    def connected(self, source, target):
+        """Returns whether any path connects two people."""
+        return self.component(source) == self.component(target)
+
+    def size(self, person_id):
+        """Returns the number of people in a person's component."""
+        return self.sizes[self.component(person_id)]
+
+    def add_person(self, person_id):
+        """
+        Adds a person in a component of their own. People must be added
+        in the same order as to the graph, so their indices agree.
+        """
+        if not isinstance(self.labels, array):
+            self.labels = array(INDEX, self.labels)
+            self.sizes = array(INDEX, self.sizes)
+        self.person_index = writable(self.person_index)
+        if person_id not in self.person_index:
+            self.person_index[person_id] = len(self.labels)
+        self.labels.append(len(self.sizes))
+        self.sizes.append(1)
+
+    def connect(self, source, target):
+        """Merges the components of two people, smaller into larger."""
+        a = self.component(source)
+        b = self.component(target)
+        if a == b:
+            return
+        if self.sizes[a] < self.sizes[b]:
+            a, b = b, a
+        if not isinstance(self.sizes, array):
+            self.sizes = array(INDEX, self.sizes)
+        self.merged[b] = a
+        self.sizes[a] += self.sizes[b]
@@ -1,7 +1,14 @@
-import csv
+import argparse
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+from components import Components
+from graph import CompactGraph, writable
+from ingest import Reader
+from landmarks import LANDMARKS, LandmarkIndex
+from namesearch import NameIndex
+from treecache import TreeCache
+from util import Node, HashedQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,54 +19,159 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph holding the person-movie adjacency, when loaded compactly.
+# In that case `people` and `movies` hold no "movies"/"stars" sets.
+graph = None
 
-def load_data(directory):
+# Compact copy of `people` and `movies` built for the tree cache and
+# landmark index, when the data was not loaded compactly
+compact_copy = None
+
+# Components of the loaded people graph
+components = None
+
+# TreeCache answering shortest_path queries, once enabled
+tree_cache = None
+
+# NameIndex for prefix and fuzzy name lookups, if built
+name_index = None
+
+# LandmarkIndex screening shortest_path queries, once enabled
+landmark_index = None
+
+
+def load_data(directory, compact=False, cache=False, workers=1,
+              name_search=False):
     """
     Load data from CSV files into memory.
+
+    With more than one worker, the CSV files are split into chunks
+    that are parsed in parallel by a pool of that many processes.
+
+    With `compact`, star credits are stored in a CompactGraph
+    instead of per-person and per-movie sets.
+
+    With `cache`, data is instead mapped from a binary snapshot of the
+    directory, which is (re)written from the CSV files when missing or
+    out of date. Cached data is always compact and read-only.
+
+    Connected components are labelled as the data is loaded.
+    With `name_search`, a NameIndex is built for prefix and fuzzy
+    name lookups.
+
+    Any previously loaded data, and indexes built over it, are dropped.
+    """
+    global graph, names, people, movies, components, name_index
+    global compact_copy, tree_cache, landmark_index
+
+    # Rebind rather than clear, as cached tables are read-only views
+    names, people, movies = {}, {}, {}
+    graph = compact_copy = components = None
+    tree_cache = name_index = landmark_index = None
+
+    if cache:
+        cached = snapshot.load(directory)
+        if cached is None:
+            load_csv(directory, compact=True, workers=workers)
+            try:
+                snapshot.write(directory, people, movies, graph, components)
+                cached = snapshot.load(directory)
+            except OSError:
+                pass
+        if cached is not None:
+            names, people, movies = cached.names, cached.people, cached.movies
+            graph = cached.graph
+            components = cached.components
+    else:
+        load_csv(directory, compact=compact, workers=workers)
+
+    if name_search:
+        name_index = NameIndex(names)
+
+
+def load_csv(directory, compact, workers):
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+    Load data from the CSV files into `names`, `people` and `movies`,
+    and `graph` if compact.
+    """
+    global graph, components
+
+    with Reader(workers) as reader:
+        people_rows = reader.read(f"{directory}/people.csv",
+                                  ("id", "name", "birth"))
+        movie_rows = reader.read(f"{directory}/movies.csv",
+                                 ("id", "title", "year"))
+        star_rows = reader.read(f"{directory}/stars.csv",
+                                ("person_id", "movie_id"))
+
+        # Load people
+        for person_id, name, birth in people_rows:
+            people[person_id] = {
+                "name": name,
+                "birth": birth,
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
+            if not compact:
+                people[person_id]["movies"] = set()
+            if name.lower() not in names:
+                names[name.lower()] = {person_id}
             else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+                names[name.lower()].add(person_id)
 
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+        # Load movies
+        for movie_id, title, year in movie_rows:
+            movies[movie_id] = {
+                "title": title,
+                "year": year,
+            }
+            if not compact:
+                movies[movie_id]["stars"] = set()
+
+        # Load stars
+        if compact:
+            graph = CompactGraph.from_credits(
+                people.keys(), movies.keys(), star_rows
+            )
+            components = Components.from_graph(graph)
+            return
+
+        for person_id, movie_id in star_rows:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
             except KeyError:
                 pass
+        components = Components.from_dicts(people, movies)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="store the graph as integer-indexed CSR arrays")
+    parser.add_argument("--cache", action="store_true",
+                        help="load from (and save) a binary snapshot")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used to parse the CSV files")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="screen queries with a landmark index")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="suggest close matches for names not found")
+    parser.add_argument("--max-people", type=int,
+                        help="give up after examining this many cast members")
+    parser.add_argument("--max-seconds", type=float,
+                        help="give up after this many seconds")
+    parser.add_argument("--hub-size", type=int,
+                        help="defer movies with larger casts than this")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact, cache=args.cache,
+              workers=args.workers, name_search=args.fuzzy)
+    if args.landmarks:
+        enable_landmarks(args.directory)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,13 +181,23 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    budget = (args.max_people, args.max_seconds, args.hub_size)
+    if any(limit is not None for limit in budget):
+        path, exact = budgeted_shortest_path(source, target, *budget)
+    else:
+        path, exact = shortest_path(source, target,
+                                    bidirectional=args.bidirectional), True
 
     if path is None:
-        print("Not connected.")
+        print("Not connected." if exact else
+              "No path found within the search budget.")
     else:
         degrees = len(path)
-        print(f"{degrees} degrees of separation.")
+        if exact:
+            print(f"{degrees} degrees of separation.")
+        else:
+            print(f"{degrees} degrees of separation (unverified; "
+                  "a shorter path may exist).")
         path = [(None, source)] + path
         for i in range(degrees):
             person1 = people[path[i][1]]["name"]
@@ -84,94 +206,360 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def bfs(processing_queue: QueueFrontier, people_processed: set, movies_processed: set, target: int):
+def bfs(processing_queue: HashedQueueFrontier, people_discovered: set, movies_processed: set, target: int):
     if processing_queue.empty():
         return None
 
     source = processing_queue.remove()
-    if source.state in people_processed:
-        return None
-    people_processed.add(source.state)
 
-    source_data = people[source.state]
-    parents_leading_here = source.parent.copy()
-    for movie in source_data["movies"]:
+    for movie in people[source.state]["movies"]:
         if movie in movies_processed:
             continue
         movies_processed.add(movie)
-        movie_data = movies[movie]
-        for star in movie_data["stars"]:
-            star_node = Node(star, parents_leading_here + [(movie, star)], None)
+        for star in movies[movie]["stars"]:
+            if star in people_discovered:
+                continue
+            people_discovered.add(star)
+            star_node = Node(star, source, movie)
             if star == target:
                 return star_node
             processing_queue.add(star_node)
 
 
-def shortest_path(source, target):
+def path_to(node):
+    """
+    Rebuilds the list of (movie_id, person_id) pairs leading to `node`
+    by following its parent pointers back to the source.
+    """
+    path = []
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+    return path
+
+
+def enable_tree_cache(max_bytes):
+    """
+    Answers later shortest_path queries from an LRU cache of complete
+    search trees of at most `max_bytes`. Uses a compact copy of the
+    graph if the data was not loaded compactly.
+    """
+    global tree_cache
+    tree_cache = TreeCache(compact_graph(), max_bytes)
+
+
+def enable_landmarks(directory, count=LANDMARKS):
+    """
+    Screens later shortest_path queries with the landmark index saved
+    for `directory`, building and saving one if it is missing or stale.
+    """
+    global landmark_index
+    compact = compact_graph()
+    landmark_index = LandmarkIndex.load(compact, directory)
+    if landmark_index is None:
+        landmark_index = LandmarkIndex.build(compact, count)
+        try:
+            landmark_index.save(directory)
+        except OSError:
+            pass
+
+
+def compact_graph():
+    """
+    Returns the loaded CompactGraph, or a compact copy of the
+    `people` and `movies` dicts if the data was not loaded compactly.
+    """
+    global compact_copy
+    if graph is not None:
+        return graph
+    if compact_copy is None:
+        compact_copy = CompactGraph.from_dicts(people, movies)
+    return compact_copy
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person to the loaded data and everything built from it,
+    without reloading.
+    """
+    global names, people
+    if person_id in people:
+        raise Exception(f"person {person_id} already loaded")
+    people = writable(people)
+    names = writable(names)
+
+    people[person_id] = {"name": name, "birth": birth}
+    if graph is None:
+        people[person_id]["movies"] = set()
+    names[name.lower()] = names.get(name.lower(), set()) | {person_id}
+
+    compact = graph if graph is not None else compact_copy
+    if compact is not None:
+        compact.add_person(person_id)
+    if components is not None:
+        components.add_person(person_id)
+    if landmark_index is not None:
+        landmark_index.add_person()
+    if name_index is not None:
+        name_index.add(name.lower())
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie to the loaded data and everything built from it,
+    without reloading.
+    """
+    global movies
+    if movie_id in movies:
+        raise Exception(f"movie {movie_id} already loaded")
+    movies = writable(movies)
+
+    movies[movie_id] = {"title": title, "year": year}
+    if graph is None:
+        movies[movie_id]["stars"] = set()
+
+    compact = graph if graph is not None else compact_copy
+    if compact is not None:
+        compact.add_movie(movie_id)
+
+
+def add_star(person_id, movie_id):
+    """
+    Credits a person in a movie, updating the loaded data and everything
+    built from it. Only cached search trees the new links could shorten
+    are dropped. Returns False if the credit was already loaded.
+    """
+    if person_id not in people or movie_id not in movies:
+        raise Exception(f"unknown person {person_id} or movie {movie_id}")
+
+    compact = graph if graph is not None else compact_copy
+    if compact is not None:
+        p = compact.person_index[person_id]
+        m = compact.movie_index[movie_id]
+        linked = [p] + list(compact.stars_of(m))
+        if not compact.add_credit(p, m):
+            return False
+        if tree_cache is not None:
+            tree_cache.invalidate(linked)
+        if landmark_index is not None:
+            landmark_index.add_links(linked)
+        costars = [compact.person_ids[q] for q in linked[1:]]
+
+    if graph is None:
+        if movie_id in people[person_id]["movies"]:
+            return False
+        costars = list(movies[movie_id]["stars"])
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+
+    if components is not None and costars:
+        components.connect(person_id, costars[0])
+    return True
+
+
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    With `bidirectional`, searches from both ends at once instead.
+    Queries are answered from the tree cache instead, or screened by
+    the landmark index, if enabled.
     """
+    if components is not None and not components.connected(source, target):
+        return None
+
+    if tree_cache is not None:
+        return tree_cache.shortest_path(source, target)
+    if landmark_index is not None:
+        return landmark_index.shortest_path(source, target, bidirectional)
+
+    if graph is not None:
+        return graph.shortest_path(source, target, bidirectional)
 
     if source == target:
         return list()
 
-    processing_queue = QueueFrontier()
+    if bidirectional:
+        return bidirectional_search(source, target)
+
+    processing_queue = HashedQueueFrontier()
     movies_processed = set()
-    people_processed = set()
+    people_discovered = {source}
 
-    source_node = Node(source, list(), None)
-    processing_queue.add(source_node)
+    processing_queue.add(Node(source, None, None))
 
     target_node = None
 
     while not target_node and not processing_queue.empty():
-        target_node = bfs(processing_queue, people_processed, movies_processed, target)
+        target_node = bfs(processing_queue, people_discovered, movies_processed, target)
 
     if target_node is None:
         return None
 
-    path_to_target = target_node.parent
+    return path_to(target_node)
 
-    if len(path_to_target) == 0:
-        return None
 
-    return path_to_target
+def budgeted_shortest_path(source, target, max_people=None, max_seconds=None,
+                           hub_size=None):
+    """
+    Searches for a path between two people within a budget, for bounded
+    latency on graphs with very large casts. Movies are expanded smallest
+    cast first, and those with more than `hub_size` stars only once
+    nothing else is left. The search gives up after examining
+    `max_people` cast members or after `max_seconds`.
+
+    Returns (path, exact), where `exact` is False if the path may not be
+    the shortest because hub movies were deferred. (None, True) means not
+    connected, and (None, False) that the budget ran out first.
+    """
+    if components is not None and not components.connected(source, target):
+        return None, True
+    return compact_graph().budgeted_shortest_path(
+        source, target, max_people, max_seconds, hub_size
+    )
+
+
+def expand_level(frontier, parents, movies_processed, other_parents):
+    """
+    Expands every person in `frontier` by one movie.
+
+    Newly discovered people are recorded in `parents` as
+    (movie_id, person_id) pointing back towards the side's origin.
+    Returns the next frontier and the first person also discovered
+    from the other side, or None if the searches have not met.
+    """
+    next_frontier = []
+    for person in frontier:
+        for movie in people[person]["movies"]:
+            if movie in movies_processed:
+                continue
+            movies_processed.add(movie)
+            for star in movies[movie]["stars"]:
+                if star in parents:
+                    continue
+                parents[star] = (movie, person)
+                if star in other_parents:
+                    return next_frontier, star
+                next_frontier.append(star)
+    return next_frontier, None
+
+
+def bidirectional_search(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, searching one level at a time
+    from whichever end currently has the smaller frontier.
+
+    Because whole levels are expanded, the first person reached
+    from both ends lies on a shortest path.
+    """
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    forward_movies = set()
+    backward_movies = set()
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, forward_movies, backward
+            )
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, backward_movies, forward
+            )
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    return None
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Builds the source-to-target path through `meeting` from the
+    parent pointers of a bidirectional search.
+    """
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, previous = forward[person]
+        path.append((movie, person))
+        person = previous
+    path.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, following = backward[person]
+        path.append((movie, following))
+        person = following
+    return path
 
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If the name index is built, close matches are offered
+    for names not found.
     """
     person_ids = list(names.get(name.lower(), set()))
+    if len(person_ids) == 0 and name_index is not None:
+        person_ids = search_names(name)
+        if person_ids:
+            print(f"'{name}' not found. Did you mean:")
+            return choose_person(person_ids)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
+        return choose_person(person_ids)
     else:
         return person_ids[0]
 
 
+def choose_person(person_ids):
+    """
+    Lists people and asks which one is intended,
+    returning their id or None.
+    """
+    for person_id in person_ids:
+        person = people[person_id]
+        name = person["name"]
+        birth = person["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
+def search_names(query, limit=10):
+    """
+    Returns the ids of people whose names start with or closely
+    match `query`, best matches first. Requires the name index.
+    """
+    person_ids = []
+    for name in name_index.search(query, limit):
+        person_ids.extend(sorted(names[name]))
+    return person_ids[:limit]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
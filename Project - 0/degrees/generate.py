@@ -0,0 +1,115 @@
+import argparse
+import bisect
+import csv
+import itertools
+import os
+import random
+
+FIRST_NAMES = [
+    "Adam", "Alice", "Anna", "Ben", "Carla", "Chris", "Dan", "Diane", "Emma",
+    "Eric", "Fay", "Frank", "Grace", "Hank", "Ida", "Jack", "Jane", "Kate",
+    "Leo", "Lucy", "Mark", "Mia", "Nina", "Omar", "Paul", "Rosa", "Sam",
+    "Tara", "Tom", "Uma", "Vic", "Will", "Yara", "Zoe",
+]
+
+LAST_NAMES = [
+    "Adams", "Baker", "Brown", "Clark", "Davis", "Evans", "Garcia", "Green",
+    "Hall", "Harris", "Hill", "Jones", "King", "Lee", "Lewis", "Lopez",
+    "Martin", "Miller", "Moore", "Nguyen", "Parker", "Reed", "Scott", "Smith",
+    "Taylor", "Walker", "White", "Wilson", "Wright", "Young",
+]
+
+
+def cast_size(alpha, smallest, largest):
+    """
+    Draws a power-law distributed cast size between `smallest`
+    and `largest`.
+    """
+    return min(largest, int(smallest * random.paretovariate(alpha)))
+
+
+def popularity(people, alpha):
+    """
+    Returns cumulative weights giving person `i` a share of roles
+    proportional to 1 / (i + 1) ** alpha, so filmographies follow a
+    power law with a few very prolific people.
+    """
+    return list(itertools.accumulate(1 / (i + 1) ** alpha for i in range(people)))
+
+
+def write_stars(path, movies, weights, cast_alpha=1.6, smallest_cast=2,
+                largest_cast=500):
+    """
+    Writes stars.csv, casting each movie with people drawn by popularity.
+    Returns the number of credits written.
+    """
+    total = weights[-1]
+    credits = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for m in range(movies):
+            cast = set()
+            for _ in range(cast_size(cast_alpha, smallest_cast, largest_cast)):
+                cast.add(bisect.bisect(weights, random.random() * total))
+            writer.writerows((p, m) for p in cast)
+            credits += len(cast)
+    return credits
+
+
+def generate(directory, people, movies, cast_alpha=1.6, role_alpha=0.5,
+             smallest_cast=2, largest_cast=500):
+    """
+    Writes people.csv, movies.csv and stars.csv in the format of the
+    IMDB datasets, returning the number of credits written.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        f.write("id,name,birth\n")
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        for p in range(people):
+            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
+            writer.writerow([p, name, random.randint(1900, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        f.write("id,title,year\n")
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        for m in range(movies):
+            writer.writerow([m, f"Movie {m}", random.randint(1920, 2024)])
+
+    return write_stars(
+        os.path.join(directory, "stars.csv"), movies,
+        popularity(people, role_alpha), cast_alpha, smallest_cast, largest_cast
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic dataset for degrees.py with "
+                    "power-law cast sizes and filmographies."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=1_000_000)
+    parser.add_argument("--movies", type=int, default=300_000)
+    parser.add_argument("--cast-alpha", type=float, default=1.6,
+                        help="power-law exponent of cast sizes")
+    parser.add_argument("--role-alpha", type=float, default=0.5,
+                        help="power-law exponent of roles per person")
+    parser.add_argument("--smallest-cast", type=int, default=2)
+    parser.add_argument("--largest-cast", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    credits = generate(args.directory, args.people, args.movies,
+                       args.cast_alpha, args.role_alpha,
+                       args.smallest_cast, args.largest_cast)
+    print(f"Wrote {args.people} people, {args.movies} movies "
+          f"and {credits} credits to {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
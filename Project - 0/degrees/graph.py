@@ -0,0 +1,464 @@
+import time
+from array import array
+from collections import ChainMap
+from collections.abc import MutableMapping
+
+# Typecode for dense person/movie indices and CSR offsets
+INDEX = "i"
+
+# Typecode for degrees of separation
+DISTANCE = "h"
+
+
+class CompactGraph():
+    """
+    Person-movie bipartite graph with dense integer indices.
+
+    Adjacency is stored in CSR form: the movies of person `p` are
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the
+    stars of movie `m` are `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+
+    People, movies and credits added after the graph is built are kept
+    in small overlays next to the CSR arrays, which are never modified.
+    """
+
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {pid: i for i, pid in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Movies and stars added for a person or movie index since the
+        # graph was built; people and movies added since have no CSR row
+        self.added_movies = {}
+        self.added_stars = {}
+
+    @classmethod
+    def from_credits(cls, person_ids, movie_ids, credits):
+        """
+        Builds a graph from lists of person and movie IDs and an iterable
+        of (person_id, movie_id) credits. Credits naming an unknown person
+        or movie are ignored, as are duplicates.
+        """
+        person_ids = list(person_ids)
+        movie_ids = list(movie_ids)
+        person_index = {pid: i for i, pid in enumerate(person_ids)}
+        movie_index = {mid: i for i, mid in enumerate(movie_ids)}
+
+        seen = set()
+        credit_people = array(INDEX)
+        credit_movies = array(INDEX)
+        for person_id, movie_id in credits:
+            p = person_index.get(person_id)
+            m = movie_index.get(movie_id)
+            if p is None or m is None or (p, m) in seen:
+                continue
+            seen.add((p, m))
+            credit_people.append(p)
+            credit_movies.append(m)
+        del seen
+
+        person_offsets, person_movies = csr(
+            len(person_ids), credit_people, credit_movies
+        )
+        movie_offsets, movie_people = csr(
+            len(movie_ids), credit_movies, credit_people
+        )
+        return cls(person_ids, movie_ids,
+                   person_offsets, person_movies, movie_offsets, movie_people,
+                   person_index, movie_index)
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Builds a graph from the `people` and `movies` dicts of degrees.py.
+        """
+        credits = (
+            (person_id, movie_id)
+            for person_id, person in people.items()
+            for movie_id in person["movies"]
+        )
+        return cls.from_credits(people.keys(), movies.keys(), credits)
+
+    def movies_of(self, p):
+        """Returns the movie indices of person index `p`."""
+        added = self.added_movies.get(p)
+        if added is not None and p + 1 >= len(self.person_offsets):
+            return added
+        movies = self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+        return movies if added is None else movies.tolist() + added
+
+    def stars_of(self, m):
+        """Returns the person indices of movie index `m`."""
+        added = self.added_stars.get(m)
+        if added is not None and m + 1 >= len(self.movie_offsets):
+            return added
+        stars = self.movie_people[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+        return stars if added is None else stars.tolist() + added
+
+    def add_person(self, person_id):
+        """Adds a person with no movies, returning their index."""
+        self.person_ids = appendable(self.person_ids)
+        self.person_index = writable(self.person_index)
+        p = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_index[person_id] = p
+        self.added_movies[p] = []
+        return p
+
+    def add_movie(self, movie_id):
+        """Adds a movie with no stars, returning its index."""
+        self.movie_ids = appendable(self.movie_ids)
+        self.movie_index = writable(self.movie_index)
+        m = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_index[movie_id] = m
+        self.added_stars[m] = []
+        return m
+
+    def add_credit(self, p, m):
+        """
+        Adds person index `p` to the stars of movie index `m`.
+        Returns False if they were already credited.
+        """
+        if m in self.movies_of(p):
+            return False
+        self.added_movies.setdefault(p, []).append(m)
+        self.added_stars.setdefault(m, []).append(p)
+        return True
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for m in self.movies_of(self.person_index[person_id]):
+            movie_id = self.movie_ids[m]
+            for q in self.stars_of(m):
+                neighbors.add((movie_id, self.person_ids[q]))
+        return neighbors
+
+    def shortest_path(self, source, target, bidirectional=False):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return list()
+        s = self.person_index[source]
+        t = self.person_index[target]
+        if bidirectional:
+            path = self.bidirectional_search(s, t)
+        else:
+            path = self.bfs(s, t)
+        if path is None:
+            return None
+        return [(self.movie_ids[m], self.person_ids[p]) for m, p in path]
+
+    def budgeted_shortest_path(self, source, target, max_people=None,
+                               max_seconds=None, hub_size=None):
+        """
+        Like shortest_path, but within a search budget; see
+        budgeted_search. Returns (path, exact).
+        """
+        if source == target:
+            return list(), True
+        path, exact = self.budgeted_search(
+            self.person_index[source], self.person_index[target],
+            max_people, max_seconds, hub_size
+        )
+        if path is None:
+            return None, exact
+        return [(self.movie_ids[m], self.person_ids[p]) for m, p in path], exact
+
+    def bfs(self, s, t):
+        """
+        Breadth-first search between person indices, returning a list of
+        (movie index, person index) pairs or None.
+        """
+        parent, parent_movie = self.bfs_tree(s, t)
+        if parent[t] == -1:
+            return None
+        return walk_parents(t, s, parent, parent_movie)
+
+    def bfs_tree(self, s, t=-1):
+        """
+        Breadth-first search from person index `s`, stopping early once
+        `t` is reached. Returns arrays giving, for each person index, its
+        parent in the search tree and the movie linking them, or -1 for
+        people not reached. The parent of `s` is itself.
+        """
+        parent = array(INDEX, [-1]) * len(self.person_ids)
+        parent_movie = array(INDEX, [-1]) * len(self.person_ids)
+        movies_processed = bytearray(len(self.movie_ids))
+        parent[s] = s
+
+        frontier = [s]
+        while frontier:
+            next_frontier = []
+            for p in frontier:
+                for m in self.movies_of(p):
+                    if movies_processed[m]:
+                        continue
+                    movies_processed[m] = 1
+                    for q in self.stars_of(m):
+                        if parent[q] != -1:
+                            continue
+                        parent[q] = p
+                        parent_movie[q] = m
+                        if q == t:
+                            return parent, parent_movie
+                        next_frontier.append(q)
+            frontier = next_frontier
+        return parent, parent_movie
+
+    def distances(self, s):
+        """
+        Returns an array of the degrees of separation between person
+        index `s` and every person index, or -1 for people not connected.
+        """
+        distance = array(DISTANCE, [-1]) * len(self.person_ids)
+        movies_processed = bytearray(len(self.movie_ids))
+        distance[s] = 0
+
+        frontier = [s]
+        level = 0
+        while frontier:
+            level += 1
+            next_frontier = []
+            for p in frontier:
+                for m in self.movies_of(p):
+                    if movies_processed[m]:
+                        continue
+                    movies_processed[m] = 1
+                    for q in self.stars_of(m):
+                        if distance[q] == -1:
+                            distance[q] = level
+                            next_frontier.append(q)
+            frontier = next_frontier
+        return distance
+
+    def bidirectional_search(self, s, t):
+        """
+        Bidirectional breadth-first search between person indices,
+        always expanding the smaller frontier by one whole level.
+        """
+        forward, backward = self.new_side(s), self.new_side(t)
+
+        while forward["frontier"] and backward["frontier"]:
+            if len(forward["frontier"]) <= len(backward["frontier"]):
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+            meeting = self.expand_level(side, other["parent"])
+            if meeting is not None:
+                return join_sides(meeting, s, t, forward, backward)
+        return None
+
+    def budgeted_search(self, s, t, max_people=None, max_seconds=None,
+                        hub_size=None):
+        """
+        Bidirectional search between person indices that expands each
+        level's movies smallest cast first, and stops once `max_people`
+        cast members have been examined or `max_seconds` have passed.
+
+        Movies with casts larger than `hub_size` are deferred until a side
+        runs out of other movies, which finds paths sooner but may miss
+        shorter ones through the deferred movies. A path is still known to
+        be exact if it is no longer than one more than the levels both
+        sides expanded before deferring anything, as any shorter path
+        would have met within those levels.
+
+        Returns (path, exact): a list of (movie index, person index) pairs
+        or None, and whether the answer is known to be exact. The first
+        path found is returned at once, so when the budget runs out no
+        path is known and (None, False) is returned.
+        """
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+        forward, backward = self.new_side(s), self.new_side(t)
+        for side in (forward, backward):
+            side["deferred"] = []
+            # Levels fully expanded before this side first deferred a movie
+            side["clean"] = 0
+            side["deferring"] = False
+        examined = 0
+
+        while ((forward["frontier"] or forward["deferred"])
+               and (backward["frontier"] or backward["deferred"])):
+            if len(forward["frontier"]) <= len(backward["frontier"]):
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+
+            # Gather this level's movies, smallest casts first
+            movies = []
+            for p in side["frontier"]:
+                for m in self.movies_of(p):
+                    if not side["movies"][m]:
+                        side["movies"][m] = 1
+                        movies.append((len(self.stars_of(m)), m, p))
+            defer = hub_size is not None
+            if not movies:
+                # Fall back on deferred movies; levels no longer line up
+                movies, side["deferred"] = side["deferred"], []
+                defer = False
+            movies.sort()
+
+            parent, parent_movie = side["parent"], side["parent_movie"]
+            next_frontier = []
+            for size, m, p in movies:
+                if defer and size > hub_size:
+                    side["deferred"].append((size, m, p))
+                    side["deferring"] = True
+                    continue
+                if ((max_people is not None and examined + size > max_people)
+                        or (deadline is not None and time.perf_counter() > deadline)):
+                    return None, False
+                examined += size
+                for q in self.stars_of(m):
+                    if parent[q] != -1:
+                        continue
+                    parent[q] = p
+                    parent_movie[q] = m
+                    if other["parent"][q] != -1:
+                        path = join_sides(q, s, t, forward, backward)
+                        bound = forward["clean"] + backward["clean"] + 1
+                        return path, len(path) <= max(bound, 1)
+                    next_frontier.append(q)
+            side["frontier"] = next_frontier
+            if not side["deferring"]:
+                side["clean"] += 1
+        # One side has run out of people to reach, so no path exists
+        return None, True
+
+    def new_side(self, origin):
+        """Returns the state of one side of a bidirectional search."""
+        parent = array(INDEX, [-1]) * len(self.person_ids)
+        parent[origin] = origin
+        return {
+            "parent": parent,
+            "parent_movie": array(INDEX, [-1]) * len(self.person_ids),
+            "movies": bytearray(len(self.movie_ids)),
+            "frontier": [origin],
+        }
+
+    def expand_level(self, side, other_parent):
+        """
+        Expands one level of a side of a bidirectional search, returning
+        the first person index also reached by the other side, if any.
+        """
+        parent, parent_movie = side["parent"], side["parent_movie"]
+        movies_processed = side["movies"]
+        next_frontier = []
+        for p in side["frontier"]:
+            for m in self.movies_of(p):
+                if movies_processed[m]:
+                    continue
+                movies_processed[m] = 1
+                for q in self.stars_of(m):
+                    if parent[q] != -1:
+                        continue
+                    parent[q] = p
+                    parent_movie[q] = m
+                    if other_parent[q] != -1:
+                        return q
+                    next_frontier.append(q)
+        side["frontier"] = next_frontier
+        return None
+
+
+class ExtendedSequence():
+    """A read-only sequence followed by a list of appended items."""
+
+    def __init__(self, base):
+        self.base = base
+        self.extra = []
+
+    def __len__(self):
+        return len(self.base) + len(self.extra)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i < len(self.base):
+            return self.base[i]
+        return self.extra[i - len(self.base)]
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.extra
+
+    def append(self, item):
+        self.extra.append(item)
+
+
+def appendable(sequence):
+    """Returns `sequence`, or an appendable wrapper if it is read-only."""
+    if hasattr(sequence, "append"):
+        return sequence
+    return ExtendedSequence(sequence)
+
+
+def writable(mapping):
+    """Returns `mapping`, or a writable overlay if it is read-only."""
+    if isinstance(mapping, MutableMapping):
+        return mapping
+    return ChainMap({}, mapping)
+
+
+def csr(n, rows, cols):
+    """
+    Builds CSR offsets and indices for `n` rows from parallel arrays
+    of row and column indices, using a counting sort.
+    """
+    offsets = array(INDEX, [0]) * (n + 1)
+    for r in rows:
+        offsets[r + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    position = array(INDEX, offsets)
+    indices = array(INDEX, [0]) * len(rows)
+    for r, c in zip(rows, cols):
+        indices[position[r]] = c
+        position[r] += 1
+    return offsets, indices
+
+
+def join_sides(meeting, s, t, forward, backward):
+    """
+    Joins the two sides of a bidirectional search at person index
+    `meeting` into one path of (movie index, person index) pairs.
+    """
+    path = walk_parents(meeting, s, forward["parent"], forward["parent_movie"])
+    q = meeting
+    while q != t:
+        m = backward["parent_movie"][q]
+        q = backward["parent"][q]
+        path.append((m, q))
+    return path
+
+
+def walk_parents(p, origin, parent, parent_movie):
+    """
+    Follows parent arrays from person index `p` back to `origin`,
+    returning the (movie index, person index) pairs in forward order.
+    """
+    path = []
+    while p != origin:
+        path.append((parent_movie[p], p))
+        p = parent[p]
+    path.reverse()
+    return path
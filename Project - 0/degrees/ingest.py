@@ -0,0 +1,117 @@
+import csv
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+# Target size of each chunk of a CSV file handed to a worker
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class Reader():
+    """
+    Reads CSV files as tuples of selected columns.
+
+    With one worker, rows are parsed lazily as they are iterated over.
+    With more, each file is split into byte ranges on line boundaries
+    that are parsed concurrently by a process pool, keeping only about
+    as many chunks in flight as there are workers. Fields must not
+    contain newlines.
+    """
+
+    def __init__(self, workers=1, chunk_size=CHUNK_SIZE):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.executor = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def read(self, path, columns):
+        """
+        Returns an iterator over the rows of `path` as tuples of the
+        named `columns`, in file order.
+        """
+        header, start = read_header(path)
+        try:
+            indices = [header.index(column) for column in columns]
+        except ValueError:
+            raise Exception(f"{path} must have columns {', '.join(columns)}")
+
+        if self.executor is None:
+            return stream_rows(path, indices)
+        return self.read_chunks(path, start, os.path.getsize(path), indices)
+
+    def read_chunks(self, path, start, end, indices):
+        """
+        Yields the rows of `path` parsed chunk by chunk in the pool,
+        submitting the next chunks only as earlier ones are consumed.
+        """
+        pending = deque()
+        for lo, hi in chunk_ranges(start, end, self.chunk_size):
+            pending.append(
+                self.executor.submit(read_chunk, path, lo, hi, indices)
+            )
+            if len(pending) > self.workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def read_header(path):
+    """Returns the column names of `path` and the offset of its first row."""
+    with open(path, "rb") as f:
+        line = f.readline()
+    header = next(csv.reader([line.decode("utf-8-sig")]), [])
+    return header, len(line)
+
+
+def chunk_ranges(start, end, chunk_size):
+    """Splits the byte range [start, end) into ranges of about chunk_size."""
+    ranges = []
+    while start < end:
+        ranges.append((start, min(start + chunk_size, end)))
+        start += chunk_size
+    return ranges
+
+
+def stream_rows(path, indices):
+    """Yields the rows of `path` as tuples of the columns at `indices`."""
+    select = itemgetter(*indices)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row:
+                yield select(row)
+
+
+def read_chunk(path, start, end, indices):
+    """
+    Parses the rows of `path` that begin within the byte range
+    [start, end), returning them as tuples of the columns at `indices`;
+    run in a pool worker.
+    """
+    with open(path, "rb") as f:
+        if start:
+            # Skip the line straddling `start`; the previous chunk owns it
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+        if position >= end:
+            return []
+        data = f.read(end - position)
+        if not data.endswith(b"\n"):
+            data += f.readline()
+
+    select = itemgetter(*indices)
+    reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""))
+    return [select(row) for row in reader if row]
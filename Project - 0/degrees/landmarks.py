@@ -0,0 +1,225 @@
+import argparse
+import os
+import sys
+import time
+from array import array
+from collections import deque
+
+import snapshot
+from graph import DISTANCE, INDEX
+
+# Name of the index file written next to the CSV files
+FILENAME = ".degrees.landmarks"
+
+# Default number of landmarks
+LANDMARKS = 16
+
+
+class LandmarkIndex():
+    """
+    Distance oracle over a CompactGraph using precomputed distances
+    from a few high-degree landmark people.
+
+    By the triangle inequality, for every landmark L
+        |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+    so the distances give lower and upper bounds on the separation of
+    any pair, sometimes answering it outright and ruling out pairs not
+    connected. Other queries fall back on the graph's own search.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = list(landmarks)
+        self.distances = list(distances)
+
+    @classmethod
+    def build(cls, graph, count=LANDMARKS):
+        """
+        Builds an index using the `count` people with the most movies,
+        skipping any already connected to a chosen landmark by one movie
+        so the landmarks are spread across the graph.
+        """
+        # Counted through movies_of, so people and credits added since
+        # loading are ranked too
+        candidates = sorted(
+            range(len(graph.person_ids)),
+            key=lambda p: len(graph.movies_of(p)),
+            reverse=True
+        )
+        landmarks = []
+        distances = []
+        for p in candidates:
+            if len(landmarks) == count:
+                break
+            if any(0 <= d[p] <= 1 for d in distances):
+                continue
+            landmarks.append(p)
+            distances.append(graph.distances(p))
+        return cls(graph, landmarks, distances)
+
+    def save(self, directory):
+        sections = {
+            f"distance_{i}": d for i, d in enumerate(self.distances)
+        }
+        sections["landmarks"] = array(INDEX, self.landmarks)
+        snapshot.write_file(path_for(directory), directory, sections,
+                            people=len(self.graph.person_ids))
+
+    @classmethod
+    def load(cls, graph, directory):
+        """
+        Maps the index for `directory` into memory, or returns None if it
+        is missing or out of date.
+        """
+        mapped = snapshot.read_file(path_for(directory), directory)
+        if mapped is None:
+            return None
+        header, view = mapped
+        if header.get("people") != len(graph.person_ids):
+            return None
+        landmarks = snapshot.view_section(header, view, "landmarks")
+        distances = [
+            snapshot.view_section(header, view, f"distance_{i}")
+            for i in range(len(landmarks))
+        ]
+        return cls(graph, landmarks, distances)
+
+    def add_person(self):
+        """Extends the distances for a person just added to the graph."""
+        for i, d in enumerate(self.distances):
+            if not isinstance(d, array):
+                d = self.distances[i] = array(DISTANCE, d)
+            d.append(-1)
+
+    def add_links(self, people):
+        """
+        Updates the distances after every pair of the given person indices
+        became linked, propagating only the improvements outward.
+        """
+        graph = self.graph
+        for i, d in enumerate(self.distances):
+            reached = [d[p] for p in people if d[p] != -1]
+            if not reached:
+                continue
+            nearest = min(reached) + 1
+            improved = [p for p in people if d[p] == -1 or d[p] > nearest]
+            if not improved:
+                continue
+            if not isinstance(d, array):
+                d = self.distances[i] = array(DISTANCE, d)
+            for p in improved:
+                d[p] = nearest
+
+            # Adding links only shortens paths, so relax outwards from
+            # the improved people until nothing changes
+            queue = deque(improved)
+            while queue:
+                p = queue.popleft()
+                distance = d[p] + 1
+                for m in graph.movies_of(p):
+                    for q in graph.stars_of(m):
+                        if d[q] == -1 or d[q] > distance:
+                            d[q] = distance
+                            queue.append(q)
+
+    def bounds(self, s, t):
+        """
+        Returns (lower, upper) bounds on the separation of person indices
+        `s` and `t`, or None if they are known not to be connected.
+        Without any landmark connected to both, `upper` is None.
+        """
+        lower = 0
+        upper = None
+        for d in self.distances:
+            ds, dt = d[s], d[t]
+            if ds == -1 and dt == -1:
+                continue
+            if ds == -1 or dt == -1:
+                return None
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+    def distance(self, source, target):
+        """
+        Returns the degrees of separation between two people,
+        or None if they are not connected.
+        """
+        s = self.graph.person_index[source]
+        t = self.graph.person_index[target]
+        if s == t:
+            return 0
+        bounds = self.bounds(s, t)
+        if bounds is None:
+            return None
+        # Different people are at least one movie apart
+        lower, upper = max(bounds[0], 1), bounds[1]
+        if lower == upper:
+            return lower
+        path = self.graph.shortest_path(source, target, bidirectional=True)
+        return None if path is None else len(path)
+
+    def shortest_path(self, source, target, bidirectional=False):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+
+        The bounds only rule out pairs that are not connected; paths are
+        found by the graph's breadth-first search, from both ends at once
+        with `bidirectional`.
+        """
+        if source == target:
+            return list()
+        graph = self.graph
+        if self.bounds(graph.person_index[source],
+                       graph.person_index[target]) is None:
+            return None
+        return graph.shortest_path(source, target, bidirectional)
+
+
+def path_for(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="degrees landmark index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build and save the index")
+    build.add_argument("directory")
+    build.add_argument("--landmarks", type=int, default=LANDMARKS)
+    query = commands.add_parser("distance",
+                                help="look up the separation of two person IDs")
+    query.add_argument("directory")
+    query.add_argument("source")
+    query.add_argument("target")
+    args = parser.parse_args()
+
+    import degrees
+    degrees.load_data(args.directory, cache=True)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        index = LandmarkIndex.build(degrees.graph, args.landmarks)
+        index.save(args.directory)
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {len(index.landmarks)} landmarks in {elapsed:.2f}s.")
+        return
+
+    index = LandmarkIndex.load(degrees.graph, args.directory)
+    if index is None:
+        sys.exit("Index missing or out of date; run build first.")
+    start = time.perf_counter()
+    distance = index.distance(args.source, args.target)
+    elapsed = time.perf_counter() - start
+    if distance is None:
+        print("Not connected.")
+    else:
+        print(f"{distance} degrees of separation.")
+    print(f"Answered in {elapsed * 1000:.3f}ms.")
+
+
+if __name__ == "__main__":
+    main()
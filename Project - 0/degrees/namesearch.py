@@ -0,0 +1,142 @@
+import bisect
+from array import array
+
+from graph import INDEX
+
+# Most results returned by a search
+LIMIT = 10
+
+# Most prefix matches considered for ranking
+PREFIX_SCAN = 1000
+
+# Most candidates scored by edit distance in a fuzzy search
+CANDIDATES = 200
+
+# Trigrams shared by more names than this are skipped in fuzzy search,
+# unless every trigram of the query is that common
+COMMON = 50000
+
+
+class NameIndex():
+    """
+    Search index over lowercase names.
+
+    Names are kept sorted, so all names with a given prefix form one
+    contiguous range found by binary search. For fuzzy search, each
+    trigram maps to the names containing it; names sharing the most
+    trigrams with the query are ranked by edit distance.
+    """
+
+    def __init__(self, names):
+        self.names = sorted(set(names))
+        # Postings refer to positions in `entries`, which only grows,
+        # so names can be added without renumbering them
+        self.entries = list(self.names)
+        postings = {}
+        for i, name in enumerate(self.entries):
+            for gram in set(trigrams(name)):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {
+            gram: array(INDEX, indices) for gram, indices in postings.items()
+        }
+
+    def add(self, name):
+        """Adds a lowercase name to the index, if not already present."""
+        i = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return
+        self.names.insert(i, name)
+        self.entries.append(name)
+        for gram in set(trigrams(name)):
+            self.postings.setdefault(gram, array(INDEX)).append(
+                len(self.entries) - 1
+            )
+
+    def prefix(self, query, limit=LIMIT):
+        """
+        Returns up to `limit` names starting with `query`, shortest first.
+        Only the first PREFIX_SCAN names in sorted order are considered.
+        """
+        query = query.lower()
+        lo = bisect.bisect_left(self.names, query)
+        matches = []
+        for name in self.names[lo:lo + PREFIX_SCAN]:
+            if not name.startswith(query):
+                break
+            matches.append(name)
+        matches.sort(key=lambda name: (len(name), name))
+        return matches[:limit]
+
+    def fuzzy(self, query, limit=LIMIT, max_distance=None):
+        """
+        Returns up to `limit` names closest to `query` by edit distance,
+        as (name, distance) pairs, closest first. By default names up to
+        a third of the query's length away are allowed.
+        """
+        query = query.lower()
+        if max_distance is None:
+            max_distance = max(1, len(query) // 3)
+
+        grams = set(trigrams(query))
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return []
+        selective = [p for p in lists if len(p) <= COMMON]
+        if selective:
+            lists = selective
+
+        shared = {}
+        for postings in lists:
+            for i in postings:
+                shared[i] = shared.get(i, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:CANDIDATES]
+
+        matches = []
+        for i in candidates:
+            name = self.entries[i]
+            distance = edit_distance(query, name, max_distance)
+            if distance is not None:
+                matches.append((distance, -shared[i], name))
+        matches.sort()
+        return [(name, distance) for distance, _, name in matches[:limit]]
+
+    def search(self, query, limit=LIMIT):
+        """
+        Returns up to `limit` names matching `query`: exact and prefix
+        matches first, then fuzzy matches.
+        """
+        results = self.prefix(query, limit)
+        if len(results) < limit:
+            for name, _ in self.fuzzy(query, limit):
+                if name not in results:
+                    results.append(name)
+        return results[:limit]
+
+
+def trigrams(name):
+    """Returns the trigrams of a name padded with spaces at both ends."""
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Returns the Levenshtein distance between two strings, or None
+    if it exceeds `max_distance`.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    distance = previous[-1]
+    return distance if distance <= max_distance else None
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import degrees
+from batch import resolve
+
+
+class Metrics():
+    """Counts requests and keeps recent latencies for percentile reports."""
+
+    def __init__(self, window=10000):
+        self.window = window
+        self.latencies = []
+        self.requests = 0
+        self.errors = 0
+
+    def record(self, seconds, error=False):
+        self.requests += 1
+        self.errors += error
+        self.latencies.append(seconds)
+        if len(self.latencies) > self.window:
+            del self.latencies[:len(self.latencies) - self.window]
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        summary = {"requests": self.requests, "errors": self.errors}
+        for p in (50, 90, 99):
+            if latencies:
+                i = min(len(latencies) - 1, len(latencies) * p // 100)
+                summary[f"p{p}_ms"] = round(latencies[i] * 1000, 3)
+        return summary
+
+
+class Server():
+    """
+    Answers degrees-of-separation queries over a line protocol.
+
+    Each request is one line of JSON, either
+        {"source": ..., "target": ...}
+    with person IDs or unambiguous names, or {"stats": true} for
+    latency metrics. Each response is one line of JSON. Searches run in
+    a thread so connections are served concurrently while the graph
+    stays loaded in this process.
+    """
+
+    def __init__(self, bidirectional=False):
+        self.bidirectional = bidirectional
+        self.metrics = Metrics()
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line):
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            response = {"error": f"bad request: {e}"}
+        else:
+            if request.get("stats"):
+                return self.metrics.summary()
+            response = await asyncio.to_thread(self.query, request)
+        elapsed = time.perf_counter() - start
+        self.metrics.record(elapsed, error="error" in response)
+        response["ms"] = round(elapsed * 1000, 3)
+        return response
+
+    def query(self, request):
+        """Answers one separation query, returning a response dict."""
+        try:
+            source = resolve(str(request["source"]))
+            target = resolve(str(request["target"]))
+        except KeyError as e:
+            return {"error": f"missing field: {e}"}
+        except LookupError as e:
+            return {"error": str(e)}
+
+        path = degrees.shortest_path(source, target,
+                                     bidirectional=self.bidirectional)
+        response = {"source_id": source, "target_id": target}
+        if path is None:
+            response["degrees"] = None
+        else:
+            response["degrees"] = len(path)
+            response["path"] = [
+                {
+                    "movie_id": movie_id,
+                    "title": degrees.movies[movie_id]["title"],
+                    "person_id": person_id,
+                    "name": degrees.people[person_id]["name"],
+                }
+                for movie_id, person_id in path
+            ]
+        return response
+
+
+async def serve(server, host, port, unix):
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, path=unix)
+        where = unix
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+        where = f"{host}:{port}"
+    print(f"Listening on {where}.", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve degrees-of-separation queries as JSON lines."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--bidirectional", action="store_true")
+    parser.add_argument("--tree-cache", type=int, metavar="MB")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=args.compact, cache=args.cache)
+    if args.tree_cache:
+        degrees.enable_tree_cache(args.tree_cache * 1024 * 1024)
+    print("Data loaded.", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(Server(args.bidirectional),
+                          args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
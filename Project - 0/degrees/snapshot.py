@@ -0,0 +1,335 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from components import Components
+from graph import CompactGraph, INDEX
+
+MAGIC = b"DEGREES\0"
+VERSION = 2
+
+# Name of the snapshot file written next to the CSV files
+FILENAME = ".degrees.snapshot"
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Typecode for offsets into string blobs, which may exceed 2 GiB
+OFFSET = "q"
+
+# Sections are aligned so every array view starts on an item boundary
+ALIGNMENT = 8
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as UTF-8 in a single blob,
+    where string `i` is `blob[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    @staticmethod
+    def encode(strings):
+        """Returns (offsets, blob) arrays for a sequence of strings."""
+        offsets = array(OFFSET, [0])
+        blob = bytearray()
+        for s in strings:
+            blob += s.encode("utf-8")
+            offsets.append(len(blob))
+        return offsets, array("B", blob)
+
+
+class SortedIndex(Mapping):
+    """
+    Maps keys to positions in a sequence via a precomputed sorted order,
+    so lookups are binary searches over the mapped file.
+    """
+
+    def __init__(self, order, key):
+        self.order = order
+        self.key = key
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return (self.key(i) for i in self.order)
+
+    def __getitem__(self, k):
+        lo = bisect.bisect_left(self.order, k, key=self.key)
+        if lo < len(self.order) and self.key(self.order[lo]) == k:
+            return self.order[lo]
+        raise KeyError(k)
+
+    def range(self, k):
+        """Returns all positions whose key equals `k`."""
+        lo = bisect.bisect_left(self.order, k, key=self.key)
+        hi = bisect.bisect_right(self.order, k, lo=lo, key=self.key)
+        return self.order[lo:hi]
+
+
+class NamesView(Mapping):
+    """Read-only `names` mapping of lowercase name to a set of person_ids."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.index = SortedIndex(
+            snapshot.name_order, lambda i: snapshot.person_names[i].lower()
+        )
+
+    def __len__(self):
+        return len(set(self.index))
+
+    def __iter__(self):
+        previous = None
+        for name in self.index:
+            if name != previous:
+                yield name
+            previous = name
+
+    def __getitem__(self, name):
+        person_ids = {
+            self.snapshot.person_ids[i] for i in self.index.range(name)
+        }
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+
+class RecordsView(Mapping):
+    """
+    Read-only mapping of ID to a dict of fields, built on access from
+    string tables, as in the `people` and `movies` dicts of degrees.py.
+    """
+
+    def __init__(self, index, ids, fields):
+        self.index = index
+        self.ids = ids
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        return {field: table[i] for field, table in self.fields.items()}
+
+
+class Snapshot():
+    """
+    Memory-mapped snapshot of a dataset: string tables for people
+    and movies, sorted indexes for IDs and names, the CSR graph and
+    its connected components.
+    """
+
+    def __init__(self, path, header, buffer):
+        self.path = path
+        self.header = header
+        self.buffer = buffer
+
+        self.person_ids = self.strings("person_id")
+        self.person_names = self.strings("person_name")
+        self.person_births = self.strings("person_birth")
+        self.movie_ids = self.strings("movie_id")
+        self.movie_titles = self.strings("movie_title")
+        self.movie_years = self.strings("movie_year")
+        self.name_order = self.section("name_order")
+
+        person_index = SortedIndex(
+            self.section("person_order"), self.person_ids.__getitem__
+        )
+        movie_index = SortedIndex(
+            self.section("movie_order"), self.movie_ids.__getitem__
+        )
+        self.graph = CompactGraph(
+            self.person_ids, self.movie_ids,
+            self.section("person_offsets"), self.section("person_movies"),
+            self.section("movie_offsets"), self.section("movie_people"),
+            person_index, movie_index
+        )
+        self.names = NamesView(self)
+        self.people = RecordsView(person_index, self.person_ids, {
+            "name": self.person_names, "birth": self.person_births
+        })
+        self.movies = RecordsView(movie_index, self.movie_ids, {
+            "title": self.movie_titles, "year": self.movie_years
+        })
+        self.components = Components(
+            person_index,
+            self.section("component_labels"), self.section("component_sizes")
+        )
+
+    def section(self, name):
+        return view_section(self.header, self.buffer, name)
+
+    def strings(self, name):
+        return StringTable(
+            self.section(f"{name}_offsets"), self.section(f"{name}_blob")
+        )
+
+
+def path_for(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def source_stats(directory):
+    """Returns the size and mtime of each CSV file, for invalidation."""
+    stats = {}
+    for filename in SOURCES:
+        st = os.stat(os.path.join(directory, filename))
+        stats[filename] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def load(directory):
+    """
+    Maps the snapshot for `directory` into memory.
+
+    Returns None if there is no snapshot, or if it was written by
+    another version or before the CSV files last changed.
+    """
+    mapped = read_file(path_for(directory), directory)
+    if mapped is None:
+        return None
+    header, view = mapped
+    return Snapshot(path_for(directory), header, view)
+
+
+def read_file(path, directory):
+    """
+    Maps a file written by write_file into memory, returning its header
+    and a memoryview of its contents.
+
+    Returns None if the file is missing or unreadable, or if it was
+    written by another version or before the CSV files in `directory`
+    last changed.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(buffer)
+    prefix = struct.calcsize("<II")
+    if len(view) < len(MAGIC) + prefix or view[:len(MAGIC)] != MAGIC:
+        return None
+    version, header_length = struct.unpack_from("<II", view, len(MAGIC))
+    if version != VERSION:
+        return None
+    start = len(MAGIC) + prefix
+    try:
+        header = json.loads(bytes(view[start:start + header_length]))
+    except ValueError:
+        return None
+    if (header.get("byteorder") != sys.byteorder
+            or header.get("sources") != source_stats(directory)):
+        return None
+    return header, view
+
+
+def view_section(header, view, name):
+    """Returns a zero-copy typed view of a section of a mapped file."""
+    offset, length, typecode = header["sections"][name]
+    return view[offset:offset + length].cast(typecode)
+
+
+def write(directory, people, movies, graph, components):
+    """
+    Writes a snapshot of the loaded `people`, `movies`, `graph` and
+    `components` for `directory`, replacing any existing one atomically.
+    """
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+
+    sections = {}
+
+    def add_strings(name, strings):
+        sections[f"{name}_offsets"], sections[f"{name}_blob"] = (
+            StringTable.encode(strings)
+        )
+
+    add_strings("person_id", person_ids)
+    add_strings("person_name", (people[i]["name"] for i in person_ids))
+    add_strings("person_birth", (people[i]["birth"] for i in person_ids))
+    add_strings("movie_id", movie_ids)
+    add_strings("movie_title", (movies[i]["title"] for i in movie_ids))
+    add_strings("movie_year", (movies[i]["year"] for i in movie_ids))
+
+    sections["person_order"] = sorted_order(person_ids)
+    sections["movie_order"] = sorted_order(movie_ids)
+    sections["name_order"] = sorted_order(
+        [people[i]["name"].lower() for i in person_ids]
+    )
+    sections["person_offsets"] = graph.person_offsets
+    sections["person_movies"] = graph.person_movies
+    sections["movie_offsets"] = graph.movie_offsets
+    sections["movie_people"] = graph.movie_people
+    sections["component_labels"] = components.labels
+    sections["component_sizes"] = components.sizes
+
+    write_file(path_for(directory), directory, sections)
+
+
+def write_file(path, directory, sections, **fields):
+    """
+    Writes named arrays to `path`, replacing it atomically, so they can be
+    mapped back by read_file for as long as the CSV files in `directory`
+    are unchanged. Extra `fields` are stored in the JSON header.
+    """
+    header = dict(
+        fields,
+        byteorder=sys.byteorder,
+        sources=source_stats(directory),
+        sections={},
+    )
+
+    # Lay out sections after the header; the header length depends on the
+    # offsets it records, so reserve room generously and pad it out
+    placeholder = {name: [2 ** 62, 2 ** 62, "q"] for name in sections}
+    reserved = len(json.dumps(dict(header, sections=placeholder)).encode())
+    offset = align(len(MAGIC) + struct.calcsize("<II") + reserved)
+    for name, data in sections.items():
+        length = len(data) * data.itemsize
+        header["sections"][name] = [offset, length, data.typecode]
+        offset = align(offset + length)
+
+    encoded = json.dumps(header).encode().ljust(reserved)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", VERSION, len(encoded)))
+        f.write(encoded)
+        for name, data in sections.items():
+            f.seek(header["sections"][name][0])
+            data.tofile(f)
+    os.replace(temporary, path)
+
+
+def sorted_order(keys):
+    """Returns the positions of `keys` in sorted key order."""
+    return array(INDEX, sorted(range(len(keys)), key=keys.__getitem__))
+
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
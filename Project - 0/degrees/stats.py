@@ -0,0 +1,150 @@
+import argparse
+import csv
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+
+import degrees
+from batch import resolve
+
+
+def distances_from(p):
+    """Returns the distances from person index `p`; run in a worker."""
+    return degrees.graph.distances(p)
+
+
+def eccentricity(p):
+    """
+    Returns the eccentricity of person index `p` within its component,
+    and a person at that distance; run in a worker.
+    """
+    distance = degrees.graph.distances(p)
+    farthest = max(range(len(distance)), key=distance.__getitem__)
+    return distance[farthest], farthest
+
+
+def parallel_map(function, items, workers):
+    """
+    Maps `function` over `items` in order, on a pool of processes forked
+    after the graph is loaded so they share it copy-on-write.
+    """
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        yield from map(function, items)
+        return
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        yield from pool.imap(function, items)
+
+
+def distances_command(args):
+    """Distance distributions from one or more sources over the whole graph."""
+    graph = degrees.graph
+    sources = [resolve(source) for source in args.sources]
+    indices = [graph.person_index[source] for source in sources]
+
+    start = time.perf_counter()
+    results = list(parallel_map(distances_from, indices, args.workers))
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} searches in {elapsed:.2f}s.", file=sys.stderr)
+
+    total = Counter()
+    for source, distance in zip(sources, results):
+        counts = Counter(distance)
+        total += counts
+        name = degrees.people[source]["name"]
+        print(f"{name} ({source}):")
+        print_histogram(counts)
+    if len(results) > 1:
+        print("All sources:")
+        print_histogram(total)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["person_id", "name"] + sources)
+            for p, person_id in enumerate(graph.person_ids):
+                row = [d[p] if d[p] != -1 else "" for d in results]
+                writer.writerow(
+                    [person_id, degrees.people[person_id]["name"]] + row
+                )
+
+
+def diameter_command(args):
+    """Sampled eccentricity and diameter bounds of the largest component."""
+    graph = degrees.graph
+    labels = degrees.components.labels
+    people = [p for p in range(len(graph.person_ids)) if labels[p] == 0]
+    random.seed(args.seed)
+    sample = random.sample(people, min(args.samples, len(people)))
+
+    start = time.perf_counter()
+    first = list(parallel_map(eccentricity, sample, args.workers))
+    # A second sweep from each farthest person tightens the lower bound
+    second = list(parallel_map(
+        eccentricity, [farthest for _, farthest in first], args.workers
+    ))
+    elapsed = time.perf_counter() - start
+
+    eccentricities = [e for e, _ in first]
+    lower = max(e for e, _ in first + second)
+    upper = 2 * min(eccentricities)
+    print(f"Largest component: {len(people)} people")
+    print(f"Sampled eccentricities ({len(sample)} people):")
+    print_histogram(Counter(eccentricities))
+    print(f"Diameter: at least {lower}, at most {upper}")
+    print(f"{2 * len(sample)} searches in {elapsed:.2f}s.", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["person_id", "name", "eccentricity"])
+            for p, e in zip(sample, eccentricities):
+                person_id = graph.person_ids[p]
+                writer.writerow(
+                    [person_id, degrees.people[person_id]["name"], e]
+                )
+
+
+def print_histogram(counts):
+    """Prints people per distance, where -1 means not connected."""
+    for distance in sorted(counts):
+        label = "not connected" if distance == -1 else f"{distance} degrees"
+        print(f"    {label:>15}: {counts[distance]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="degrees graph statistics")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument("--cache", action="store_true")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("distances", help=distances_command.__doc__)
+    command.add_argument("sources", nargs="+",
+                         help="person IDs or unambiguous names")
+    command.add_argument("--output", metavar="CSV",
+                         help="write each person's distances to a CSV file")
+    command.set_defaults(run=distances_command)
+
+    command = commands.add_parser("diameter", help=diameter_command.__doc__)
+    command.add_argument("--samples", type=int, default=16)
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--output", metavar="CSV",
+                         help="write sampled eccentricities to a CSV file")
+    command.set_defaults(run=diameter_command)
+
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=True, cache=args.cache)
+    print("Data loaded.", file=sys.stderr)
+    try:
+        args.run(args)
+    except LookupError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+from graph import INDEX
+
+# Default memory limit for cached trees, in bytes
+MAX_BYTES = 256 * 1024 * 1024
+
+
+class TreeCache():
+    """
+    LRU cache of complete breadth-first search trees over a CompactGraph.
+
+    A query from a cached source is answered by walking the target's
+    parent pointers back to the source. Since the graph is undirected,
+    a query to a cached target is answered the same way, walking from
+    the source towards the target. On a miss, the source's full tree is
+    computed and cached, evicting the least recently used trees to stay
+    within `max_bytes`. The cache may be shared between threads.
+    """
+
+    def __init__(self, graph, max_bytes=MAX_BYTES):
+        self.graph = graph
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def tree_bytes(self):
+        """Returns the memory used by one tree."""
+        return 2 * len(self.graph.person_ids) * array(INDEX).itemsize
+
+    def size(self):
+        """Returns the memory used by all cached trees."""
+        return len(self.trees) * self.tree_bytes()
+
+    def get(self, s):
+        """Returns the cached tree for person index `s`, or None."""
+        with self.lock:
+            tree = self.trees.get(s)
+            if tree is not None:
+                self.trees.move_to_end(s)
+            return tree
+
+    def put(self, s):
+        """Computes and caches the tree for person index `s`."""
+        tree = self.graph.bfs_tree(s)
+        if self.tree_bytes() > self.max_bytes:
+            return tree
+        with self.lock:
+            self.trees[s] = tree
+            self.trees.move_to_end(s)
+            while self.size() > self.max_bytes:
+                self.trees.popitem(last=False)
+        return tree
+
+    def invalidate(self, people):
+        """
+        Drops the trees made stale by new links between every pair of the
+        given person indices. A tree stays valid as long as the depths of
+        all of them in it are within one of each other.
+        """
+        with self.lock:
+            for s, (parent, _) in list(self.trees.items()):
+                depths = [depth(p, parent) for p in people]
+                reached = [d for d in depths if d is not None]
+                if not reached:
+                    continue
+                if len(reached) < len(depths) or max(reached) - min(reached) > 1:
+                    del self.trees[s]
+
+    def clear(self):
+        with self.lock:
+            self.trees.clear()
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return list()
+        graph = self.graph
+        s = graph.person_index[source]
+        t = graph.person_index[target]
+
+        path = None
+        tree = self.get(s)
+        if tree is not None:
+            self.hits += 1
+            path = self.walk_to_root(t, *tree, reverse=True)
+        else:
+            tree = self.get(t)
+            if tree is not None:
+                self.hits += 1
+                path = self.walk_to_root(s, *tree, reverse=False)
+            else:
+                self.misses += 1
+                path = self.walk_to_root(t, *self.put(s), reverse=True)
+
+        if path is None:
+            return None
+        return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+    @staticmethod
+    def walk_to_root(p, parent, parent_movie, reverse):
+        """
+        Returns the (movie index, person index) steps between person
+        index `p` and the root of a tree, or None if `p` is not in it.
+
+        With `reverse`, steps lead from the root to `p`; otherwise they
+        lead from `p` to the root.
+        """
+        if p >= len(parent) or parent[p] == -1:
+            return None
+        path = []
+        if reverse:
+            while parent[p] != p:
+                path.append((parent_movie[p], p))
+                p = parent[p]
+            path.reverse()
+        else:
+            while parent[p] != p:
+                path.append((parent_movie[p], parent[p]))
+                p = parent[p]
+        return path
+
+
+def depth(p, parent):
+    """Returns the depth of person index `p` in a tree, or None."""
+    if p >= len(parent) or parent[p] == -1:
+        return None
+    d = 0
+    while parent[p] != p:
+        p = parent[p]
+        d += 1
+    return d
@@ -1,3 +1,8 @@
+import heapq
+import itertools
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +41,82 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class HashedStackFrontier():
+    """
+    Stack frontier with O(1) add, remove and contains_state.
+
+    A count of every state currently in the frontier is kept alongside
+    the nodes, so the same state may safely be added more than once.
+    """
+
+    def __init__(self):
+        self.frontier = []
+        self.states = {}
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self._pop()
+        self._forget(node.state)
+        return node
+
+    def _pop(self):
+        return self.frontier.pop()
+
+    def _forget(self, state):
+        count = self.states[state] - 1
+        if count:
+            self.states[state] = count
+        else:
+            del self.states[state]
+
+
+class HashedQueueFrontier(HashedStackFrontier):
+    """
+    Queue frontier backed by a deque, so removing from the front is O(1).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.frontier = deque()
+
+    def _pop(self):
+        return self.frontier.popleft()
+
+
+class PriorityFrontier(HashedStackFrontier):
+    """
+    Frontier that removes the node with the lowest priority first.
+
+    `priority` is a function of a node; nodes with equal priority are
+    removed in the order they were added.
+    """
+
+    def __init__(self, priority):
+        super().__init__()
+        self.priority = priority
+        self.counter = itertools.count()
+
+    def add(self, node):
+        heapq.heappush(
+            self.frontier, (self.priority(node), next(self.counter), node)
+        )
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def _pop(self):
+        return heapq.heappop(self.frontier)[2]
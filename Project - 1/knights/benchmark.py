@@ -0,0 +1,457 @@
+import argparse
+import gc
+import itertools
+import os
+import random
+import time
+import tracemalloc
+
+from logic import (
+    And, Not, Or, Symbol, entailments, model_check, parallel_check
+)
+import puzzle
+from sat import Solver
+
+# Connectives used for claims in generated puzzles
+CONNECTIVES = [And, Or]
+
+# model_check methods compared by the entail benchmark
+METHODS = ["enumerate", "backtrack", "vectorized", "sat"]
+
+
+def person(name):
+    """Returns the (Knight, Knave) symbols of a person."""
+    return Symbol(f"{name} is a Knight"), Symbol(f"{name} is a Knave")
+
+
+def claim(people, depth):
+    """Returns a random claim about some of `people`."""
+    if depth == 0:
+        sentence = random.choice(random.choice(people))
+    else:
+        connective = random.choice(CONNECTIVES)
+        sentence = connective(*(claim(people, depth - 1)
+                                for _ in range(random.randint(2, 3))))
+    return Not(sentence) if random.random() < 0.3 else sentence
+
+
+def generate(count, depth=2, seed=0):
+    """
+    Returns a knights puzzle with `count` people, each making one claim
+    about the others, as a knowledge base and its symbols. The claims are
+    made consistent with a hidden answer, so the puzzle has a solution.
+    """
+    random.seed(seed)
+    people = [person(f"P{i}") for i in range(count)]
+    answer = {}
+    for knight, knave in people:
+        is_knight = random.random() < 0.5
+        answer[knight.name] = is_knight
+        answer[knave.name] = not is_knight
+
+    knowledge = And()
+    for p in people:
+        knowledge.add(puzzle.is_person(p))
+    for p in people:
+        sentence = claim(people, depth)
+        # Knights tell the truth and knaves lie about the hidden answer
+        if sentence.evaluate(answer) != answer[p[0].name]:
+            sentence = Not(sentence)
+        knowledge.add(puzzle.says(p, sentence))
+    symbols = [symbol for p in people for symbol in p]
+    return knowledge, symbols
+
+
+def puzzles(args):
+    """Returns the puzzles of puzzle.py and generated ones to benchmark."""
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    cases = [
+        (f"Puzzle {i}", knowledge, symbols)
+        for i, knowledge in enumerate([puzzle.knowledge0, puzzle.knowledge1,
+                                       puzzle.knowledge2, puzzle.knowledge3])
+    ]
+    for count in args.people:
+        knowledge, symbols = generate(count, args.depth, args.seed)
+        cases.append((f"{count} people", knowledge, symbols))
+    return cases
+
+
+def evaluate(args):
+    """Compares interpreted evaluate with compiled sentences over all models."""
+    print(f"{'puzzle':>12} {'models':>8} {'evaluate ms':>12} "
+          f"{'compiled ms':>12} {'speedup':>8}")
+    for label, knowledge, _ in puzzles(args):
+        symbols = sorted(knowledge.symbols())
+        models = list(itertools.product((True, False), repeat=len(symbols)))
+
+        start = time.perf_counter()
+        for model in models:
+            knowledge.evaluate(dict(zip(symbols, model)))
+        interpreted = time.perf_counter() - start
+
+        start = time.perf_counter()
+        function = knowledge.compile(symbols)
+        for model in models:
+            function(*model)
+        compiled = time.perf_counter() - start
+
+        print(f"{label:>12} {len(models):>8} {interpreted * 1000:12.2f} "
+              f"{compiled * 1000:12.2f} {interpreted / compiled:7.1f}x")
+
+
+def entail(args):
+    """Reports the time to check every symbol of each puzzle, per method."""
+    print(f"{'puzzle':>12} {'symbols':>8} "
+          + " ".join(f"{method + ' ms':>14}" for method in args.methods))
+    for label, knowledge, symbols in puzzles(args):
+        times = []
+        answers = set()
+        for method in args.methods:
+            start = time.perf_counter()
+            answers.add(tuple(model_check(knowledge, symbol, method=method)
+                              for symbol in symbols))
+            times.append(time.perf_counter() - start)
+        if len(answers) != 1:
+            raise Exception(f"methods disagree on {label}")
+        print(f"{label:>12} {len(knowledge.symbols()):>8} "
+              + " ".join(f"{t * 1000:14.2f}" for t in times))
+
+
+def queries(args):
+    """
+    Compares checking every symbol of each puzzle one model_check at a
+    time with checking them all in one call to entailments, per method.
+    """
+    print(f"{'puzzle':>12} {'method':>10} {'each ms':>10} {'all ms':>10} "
+          f"{'speedup':>8}")
+    for label, knowledge, symbols in puzzles(args):
+        for method in args.methods:
+            start = time.perf_counter()
+            each = [symbol for symbol in symbols
+                    if model_check(knowledge, symbol, method=method)]
+            separate = time.perf_counter() - start
+
+            start = time.perf_counter()
+            entailed, _ = entailments(knowledge, symbols, method=method)
+            together = time.perf_counter() - start
+
+            if each != entailed:
+                raise Exception(f"entailments disagrees on {label}")
+            print(f"{label:>12} {method:>10} {separate * 1000:10.2f} "
+                  f"{together * 1000:10.2f} {separate / together:7.1f}x")
+
+
+def parallel(args):
+    """
+    Reports the time to check every symbol of each puzzle sequentially
+    and with parallel_check on each number of workers, and the speedup.
+    """
+    print(f"{'puzzle':>12} {'workers':>8} {'ms':>10} {'speedup':>8}")
+    for label, knowledge, symbols in puzzles(args):
+        names = [
+            sorted(knowledge.frozen_symbols() | symbol.frozen_symbols())
+            for symbol in symbols
+        ]
+        start = time.perf_counter()
+        expected = [model_check(knowledge, symbol, method=args.method)
+                    for symbol in symbols]
+        sequential = time.perf_counter() - start
+        print(f"{label:>12} {'-':>8} {sequential * 1000:10.2f}")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            answers = [
+                parallel_check(knowledge, symbol, names[i], {"nodes": 0},
+                               workers, args.method)
+                for i, symbol in enumerate(symbols)
+            ]
+            elapsed = time.perf_counter() - start
+            if answers != expected:
+                raise Exception(f"parallel_check disagrees on {label}")
+            print(f"{label:>12} {workers:>8} {elapsed * 1000:10.2f} "
+                  f"{sequential / elapsed:7.1f}x")
+
+
+def prune(args):
+    """
+    Reports the models examined by full enumeration and the partial
+    models examined by backtracking, over every symbol of each puzzle.
+    """
+    print(f"{'puzzle':>12} {'enumerate':>12} {'ms':>9} "
+          f"{'backtrack':>12} {'ms':>9}")
+    for label, knowledge, symbols in puzzles(args):
+        row = []
+        for method in ("enumerate", "backtrack"):
+            nodes = 0
+            start = time.perf_counter()
+            for symbol in symbols:
+                stats = {}
+                model_check(knowledge, symbol, method=method, stats=stats)
+                nodes += stats["nodes"]
+            elapsed = time.perf_counter() - start
+            row.append(f"{nodes:>12} {elapsed * 1000:9.2f}")
+        print(f"{label:>12} " + " ".join(row))
+
+
+def nodes(sentence, seen=None):
+    """Returns the number of distinct node objects in a sentence."""
+    if seen is None:
+        seen = set()
+    if id(sentence) not in seen:
+        seen.add(id(sentence))
+        for attribute in ("conjuncts", "disjuncts"):
+            for part in getattr(sentence, attribute, ()):
+                nodes(part, seen)
+        for attribute in ("operand", "antecedent", "consequent",
+                          "left", "right"):
+            if hasattr(sentence, attribute):
+                nodes(getattr(sentence, attribute), seen)
+    return len(seen)
+
+
+def size(sentence):
+    """Returns the number of nodes evaluating a sentence visits at most."""
+    parts = [getattr(sentence, attribute)
+             for attribute in ("operand", "antecedent", "consequent",
+                               "left", "right")
+             if hasattr(sentence, attribute)]
+    parts += getattr(sentence, "conjuncts", []) + getattr(sentence, "disjuncts", [])
+    return 1 + sum(size(part) for part in parts)
+
+
+def simplify(args):
+    """
+    Compares the size and evaluation time over all models of each puzzle
+    as built and simplified, interpreted and compiled, and the time to
+    model_check every symbol as built and simplifying on every call.
+    """
+    print(f"{'puzzle':>12} {'form':>10} {'size':>7} {'evaluate ms':>12} "
+          f"{'compiled ms':>12} {'check ms':>9}")
+    for label, knowledge, queries in puzzles(args):
+        symbols = sorted(knowledge.symbols())
+        models = list(itertools.product((True, False), repeat=len(symbols)))
+        for form, sentence in (("built", knowledge),
+                               ("simplified", knowledge.simplify())):
+            start = time.perf_counter()
+            for model in models:
+                sentence.evaluate(dict(zip(symbols, model)))
+            interpreted = time.perf_counter() - start
+
+            function = sentence.compile(symbols)
+            start = time.perf_counter()
+            for model in models:
+                function(*model)
+            compiled = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for query in queries:
+                model_check(knowledge, query, simplify=form == "simplified")
+            checked = time.perf_counter() - start
+
+            print(f"{label:>12} {form:>10} {size(sentence):>7} "
+                  f"{interpreted * 1000:12.2f} {compiled * 1000:12.2f} "
+                  f"{checked * 1000:9.2f}")
+
+
+def intern(args):
+    """
+    Compares node count, memory and SAT checking time of generated
+    knowledge bases as built and interned.
+    """
+    print(f"{'people':>8} {'form':>9} {'nodes':>8} {'KiB':>9} {'sat ms':>9}")
+    for count in args.people:
+        for form in ("built", "interned"):
+            gc.collect()
+            tracemalloc.start()
+            knowledge, symbols = generate(count, args.depth, args.seed)
+            if form == "interned":
+                knowledge = knowledge.interned()
+            gc.collect()
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            for symbol in symbols:
+                model_check(knowledge, symbol, method="sat")
+            elapsed = time.perf_counter() - start
+            print(f"{count:>8} {form:>9} {nodes(knowledge):>8} "
+                  f"{memory / 1024:9.1f} {elapsed * 1000:9.2f}")
+
+
+def cnf(args):
+    """Compares the size and time of Tseitin and equivalent CNF encodings."""
+    print(f"{'puzzle':>12} {'encoding':>10} {'variables':>10} "
+          f"{'clauses':>10} {'literals':>10} {'ms':>9}")
+    for label, knowledge, _ in puzzles(args):
+        for encoding, tseitin in (("tseitin", True), ("equivalent", False)):
+            start = time.perf_counter()
+            clauses = knowledge.to_cnf(tseitin)
+            elapsed = time.perf_counter() - start
+            literals = sum(len(clause) for clause in clauses.clauses)
+            print(f"{label:>12} {encoding:>10} {clauses.count:>10} "
+                  f"{len(clauses.clauses):>10} {literals:>10} "
+                  f"{elapsed * 1000:9.2f}")
+
+
+def random_clause(count):
+    """Returns a random clause of three literals over `count` variables."""
+    return [random.choice((1, -1)) * random.randint(1, count)
+            for _ in range(3)]
+
+
+def satisfies(model, clauses):
+    """Returns whether a model, indexed by variable, satisfies `clauses`."""
+    return all(any((literal > 0) == model[abs(literal)] for literal in clause)
+               for clause in clauses)
+
+
+def brute_force(clauses, count):
+    """Returns whether clauses over `count` variables have a model."""
+    return any(satisfies((None, *model), clauses)
+               for model in itertools.product((True, False), repeat=count))
+
+
+def check_solve(solver, clauses, count, assumptions=()):
+    """
+    Solves with `assumptions`, raising an exception unless the answer
+    and any model agree with trying every model.
+    """
+    required = clauses + [[literal] for literal in assumptions]
+    answer = solver.solve(assumptions)
+    if answer != brute_force(required, count):
+        raise Exception(f"solver answered {answer} for {clauses} "
+                        f"assuming {assumptions}")
+    if answer and not satisfies(solver.model, required):
+        raise Exception(f"solver model fails {clauses} "
+                        f"assuming {assumptions}")
+    return answer
+
+
+def pigeonhole(pigeons, holes):
+    """
+    Returns clauses putting every pigeon in a hole with no two in the
+    same, which are unsatisfiable with more pigeons than holes.
+    """
+    def variable(pigeon, hole):
+        return pigeon * holes + hole + 1
+
+    clauses = [[variable(p, h) for h in range(holes)] for p in range(pigeons)]
+    for h in range(holes):
+        for p, q in itertools.combinations(range(pigeons), 2):
+            clauses.append([-variable(p, h), -variable(q, h)])
+    return clauses
+
+
+def sat(args):
+    """
+    Checks the SAT solver against trying every model on random instances,
+    solving each plainly, repeatedly under assumptions on one solver, and
+    again as clauses are added, then on an unsatisfiable pigeonhole problem.
+    """
+    random.seed(args.seed)
+    solves = satisfiable = 0
+    start = time.perf_counter()
+    for _ in range(args.instances):
+        count = random.randint(3, args.variables)
+        clauses = [random_clause(count)
+                   for _ in range(random.randint(1, 5 * count))]
+        solver = Solver(clauses)
+        results = [check_solve(solver, clauses, count)]
+        # One solver answering many queries, as sat_possible does
+        for _ in range(args.assumptions):
+            assumptions = [random.choice((1, -1)) * random.randint(1, count)
+                           for _ in range(random.randint(1, 3))]
+            results.append(check_solve(solver, clauses, count, assumptions))
+        # Clauses added between solves
+        for _ in range(args.additions):
+            clause = random_clause(count)
+            solver.add_clause(clause)
+            clauses.append(clause)
+            results.append(check_solve(solver, clauses, count))
+        solves += len(results)
+        satisfiable += sum(results)
+    elapsed = time.perf_counter() - start
+    print(f"{args.instances} random instances, {solves} solves, "
+          f"{satisfiable} satisfiable, all agree ({elapsed * 1000:.2f} ms)")
+
+    pigeons = args.holes + 1
+    solver = Solver(pigeonhole(pigeons, args.holes))
+    start = time.perf_counter()
+    if solver.solve():
+        raise Exception(f"solver fit {pigeons} pigeons in {args.holes} holes")
+    elapsed = time.perf_counter() - start
+    print(f"{pigeons} pigeons in {args.holes} holes unsatisfiable, "
+          f"{solver.conflicts} conflicts ({elapsed * 1000:.2f} ms)")
+
+
+def add_puzzle_arguments(command):
+    command.add_argument("--people", type=int, nargs="*", default=[4, 6],
+                         help="sizes of generated puzzles to include")
+    command.add_argument("--depth", type=int, default=2,
+                         help="nesting depth of generated claims")
+    command.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="knights benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("evaluate", help=evaluate.__doc__)
+    add_puzzle_arguments(command)
+    command.set_defaults(run=evaluate)
+
+    command = commands.add_parser("entail", help=entail.__doc__)
+    add_puzzle_arguments(command)
+    command.add_argument("--methods", nargs="+", choices=METHODS,
+                         default=METHODS)
+    command.set_defaults(run=entail)
+
+    command = commands.add_parser("queries", help=queries.__doc__)
+    add_puzzle_arguments(command)
+    command.add_argument("--methods", nargs="+", choices=METHODS,
+                         default=METHODS)
+    command.set_defaults(run=queries)
+
+    command = commands.add_parser("parallel", help=parallel.__doc__)
+    add_puzzle_arguments(command)
+    command.add_argument("--workers", type=int, nargs="+",
+                         default=[2, os.cpu_count() or 1])
+    command.add_argument("--method", choices=["backtrack", "enumerate"],
+                         default="enumerate")
+    command.set_defaults(run=parallel)
+
+    command = commands.add_parser("prune", help=prune.__doc__)
+    add_puzzle_arguments(command)
+    command.set_defaults(run=prune)
+
+    command = commands.add_parser("simplify", help=simplify.__doc__)
+    add_puzzle_arguments(command)
+    command.set_defaults(run=simplify)
+
+    command = commands.add_parser("intern", help=intern.__doc__)
+    add_puzzle_arguments(command)
+    command.set_defaults(run=intern)
+
+    command = commands.add_parser("cnf", help=cnf.__doc__)
+    add_puzzle_arguments(command)
+    command.set_defaults(run=cnf)
+
+    command = commands.add_parser("sat", help=sat.__doc__)
+    command.add_argument("--instances", type=int, default=300)
+    command.add_argument("--variables", type=int, default=10,
+                         help="most variables in a random instance")
+    command.add_argument("--assumptions", type=int, default=4,
+                         help="solves under assumptions per instance")
+    command.add_argument("--additions", type=int, default=3,
+                         help="clauses added and solved per instance")
+    command.add_argument("--holes", type=int, default=6)
+    command.add_argument("--seed", type=int, default=0)
+    command.set_defaults(run=sat)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,62 @@
 import itertools
+import multiprocessing
+import os
+
+from sat import Solver
+
+# Models packed into each word by vectorized_check
+WORD_BITS = 64
+
+# Symbols spanning the words of one chunk in vectorized_check, so each
+# chunk checks 2 ** CHUNK_BITS words of models at once
+CHUNK_BITS = 16
+
+# Cubes parallel_check splits the models into per worker, at least, so
+# workers finishing early can take on more
+CUBES_PER_WORKER = 4
+
+# What the worker processes of parallel_check are checking
+worker_job = None
+
+# Nesting of compiled expressions beyond which operands are computed in
+# separate statements, well below the parentheses CPython can parse
+NESTING_LIMIT = 50
 
 
 class Sentence():
+    # Interned sentences cache their hash, and their symbols once asked
+    # for, and are never changed; other sentences leave both None
+    __slots__ = ("_hash", "_symbols")
+
+    def __init__(self):
+        self._hash = None
+        self._symbols = None
+
+    def __getstate__(self):
+        # Cached hashes are only valid in the process that computed them
+        return {
+            slot: getattr(self, slot)
+            for cls in type(self).__mro__
+            for slot in getattr(cls, "__slots__", ())
+            if slot not in Sentence.__slots__
+        }
+
+    def __setstate__(self, state):
+        Sentence.__init__(self)
+        for slot, value in state.items():
+            setattr(self, slot, value)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned, returning None if its value depends on them.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -15,6 +65,135 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def frozen_symbols(self):
+        """
+        Returns a frozenset of all symbols in the logical sentence,
+        computed only once for interned sentences.
+        """
+        if self._symbols is not None:
+            return self._symbols
+        symbols = frozenset(self.symbols())
+        if self._hash is not None:
+            self._symbols = symbols
+        return symbols
+
+    def simplify(self):
+        """
+        Returns an equivalent sentence that is cheaper to evaluate: nested
+        conjunctions and disjunctions are flattened, duplicate parts and
+        double negations removed, implications rewritten as disjunctions,
+        and constants folded, where And() is true and Or() is false.
+        """
+        raise Exception("nothing to simplify")
+
+    def interned(self, table=None):
+        """
+        Returns an equal sentence built from interned nodes, where all
+        structurally identical subsentences are one shared node, which
+        compares equal by identity and caches its hash, so encoding it
+        as CNF is much faster. The cached hashes take more memory than
+        sharing usually saves. Interned sentences must not be changed.
+
+        `table` maps interned sentences to themselves; passing the same
+        dict when interning several sentences shares nodes between them.
+        """
+        raise Exception("nothing to intern")
+
+    @classmethod
+    def share(cls, sentence, table):
+        """
+        Returns the interned sentence in `table` equal to `sentence`, whose
+        parts must already be interned, adding it if there is none.
+        """
+        shared = table.get(sentence)
+        if shared is None:
+            sentence._hash = hash(sentence)
+            table[sentence] = shared = sentence
+        return shared
+
+    def parts(self):
+        """Returns the sentences the sentence is directly made of."""
+        return ()
+
+    def expression(self, args, parts):
+        """
+        Returns a Python expression computing the sentence, given a
+        mapping of symbol names to argument names and expressions
+        computing its parts.
+        """
+        raise Exception("nothing to compile")
+
+    def bitwise_expression(self, args, parts):
+        """
+        Like expression, but computing the sentence with bitwise operators
+        over many models at once. `_ones` is a value with all bits set.
+        """
+        raise Exception("nothing to compile")
+
+    def encode(self, cnf):
+        """
+        Adds clauses defining a new variable equivalent to the sentence
+        to `cnf`, and returns its literal.
+        """
+        raise Exception("nothing to encode")
+
+    def distribute(self, cnf, negated=False):
+        """
+        Returns clauses over the variables of `cnf` equivalent to the
+        sentence, or to its negation if `negated`, by distributing
+        disjunctions over conjunctions. Their number can grow
+        exponentially with the sentence.
+        """
+        raise Exception("nothing to encode")
+
+    def to_cnf(self, tseitin=True):
+        """
+        Returns a CNF requiring the sentence to be true: equisatisfiable
+        using the Tseitin encoding, or else equivalent, over the
+        sentence's symbols only.
+        """
+        cnf = CNF()
+        cnf.add(self, tseitin)
+        return cnf
+
+    def compile(self, symbols, bitwise=False):
+        """
+        Compiles the sentence into a function taking the truth values of
+        `symbols`, in order, as positional arguments, which is much faster
+        than evaluate for checking many models.
+
+        With `bitwise`, each argument packs the symbol's values in many
+        models as bits, and the function takes a value with all bits set
+        as its first argument.
+        """
+        args = {symbol: f"_{i}" for i, symbol in enumerate(symbols)}
+        params = ["_ones", *args.values()] if bitwise else list(args.values())
+        lines = [f"def compiled({', '.join(params)}):"]
+
+        # Build expressions parts first, without recursion, moving parts
+        # into statements of their own where they would nest too deeply
+        built = {}
+        for sentence in postorder(self):
+            parts = [built[id(part)] for part in sentence.parts()]
+            if any(nesting >= NESTING_LIMIT for _, nesting in parts):
+                for i, (expression, nesting) in enumerate(parts):
+                    if nesting:
+                        name = f"_t{len(lines)}"
+                        lines.append(f"    {name} = {expression}")
+                        parts[i] = (name, 0)
+            expressions = [expression for expression, _ in parts]
+            if bitwise:
+                expression = sentence.bitwise_expression(args, expressions)
+            else:
+                expression = sentence.expression(args, expressions)
+            nesting = 2 + max((nesting for _, nesting in parts), default=0)
+            built[id(sentence)] = (expression, nesting)
+
+        lines.append(f"    return {built[id(self)][0]}")
+        namespace = {}
+        exec("\n".join(lines), namespace)
+        return namespace["compiled"]
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -43,14 +222,18 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
+        super().__init__()
         self.name = name
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("symbol", self.name))
 
     def __repr__(self):
@@ -62,22 +245,58 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
     def symbols(self):
         return {self.name}
 
+    def simplify(self):
+        return self
+
+    def interned(self, table=None):
+        if self._hash is not None:
+            return self
+        # Symbols never change, so can be interned as they are
+        return Sentence.share(self, {} if table is None else table)
+
+    def expression(self, args, parts):
+        try:
+            return args[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def bitwise_expression(self, args, parts):
+        return self.expression(args, parts)
+
+    def encode(self, cnf):
+        return cnf.variable(self.name)
+
+    def distribute(self, cnf, negated=False):
+        variable = cnf.variable(self.name)
+        return [[-variable if negated else variable]]
+
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
+        super().__init__()
         Sentence.validate(operand)
         self.operand = operand
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -86,23 +305,67 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
+        if self._symbols is not None:
+            return set(self._symbols)
         return self.operand.symbols()
 
+    def simplify(self):
+        operand = self.operand.simplify()
+        if isinstance(operand, Not):
+            return operand.operand
+        if isinstance(operand, And) and not operand.conjuncts:
+            return Or()
+        if isinstance(operand, Or) and not operand.disjuncts:
+            return And()
+        return Not(operand)
+
+    def interned(self, table=None):
+        if self._hash is not None:
+            return self
+        table = {} if table is None else table
+        return Sentence.share(Not(self.operand.interned(table)), table)
+
+    def parts(self):
+        return (self.operand,)
+
+    def expression(self, args, parts):
+        return f"(not {parts[0]})"
+
+    def bitwise_expression(self, args, parts):
+        return f"(~{parts[0]})"
+
+    def encode(self, cnf):
+        return -cnf.literal(self.operand)
+
+    def distribute(self, cnf, negated=False):
+        return self.operand.distribute(cnf, not negated)
+
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
+        super().__init__()
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -115,11 +378,23 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if self._hash is not None:
+            raise TypeError("cannot change an interned sentence")
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,19 +402,70 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(*[conjunct.symbols() for conjunct in self.conjuncts])
+
+    def simplify(self):
+        conjuncts = simplify_parts(self.conjuncts, And)
+        if conjuncts is None:
+            return Or()
+        if len(conjuncts) == 1:
+            return conjuncts[0]
+        return And(*conjuncts)
+
+    def interned(self, table=None):
+        if self._hash is not None:
+            return self
+        table = {} if table is None else table
+        return Sentence.share(And(*(
+            conjunct.interned(table) for conjunct in self.conjuncts
+        )), table)
+
+    def parts(self):
+        return self.conjuncts
+
+    def expression(self, args, parts):
+        if not parts:
+            return "True"
+        return "(" + " and ".join(parts) + ")"
+
+    def bitwise_expression(self, args, parts):
+        if not parts:
+            return "_ones"
+        return "(" + " & ".join(parts) + ")"
+
+    def encode(self, cnf):
+        literals = [cnf.literal(conjunct) for conjunct in self.conjuncts]
+        x = cnf.new_variable()
+        for literal in literals:
+            cnf.clauses.append([-x, literal])
+        cnf.clauses.append([x] + [-literal for literal in literals])
+        return x
+
+    def distribute(self, cnf, negated=False):
+        parts = [conjunct.distribute(cnf, negated)
+                 for conjunct in self.conjuncts]
+        return disjoin(parts) if negated else conjoin(parts)
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
+        super().__init__()
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -151,6 +477,16 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,22 +494,73 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(*[disjunct.symbols() for disjunct in self.disjuncts])
+
+    def simplify(self):
+        disjuncts = simplify_parts(self.disjuncts, Or)
+        if disjuncts is None:
+            return And()
+        if len(disjuncts) == 1:
+            return disjuncts[0]
+        return Or(*disjuncts)
+
+    def interned(self, table=None):
+        if self._hash is not None:
+            return self
+        table = {} if table is None else table
+        return Sentence.share(Or(*(
+            disjunct.interned(table) for disjunct in self.disjuncts
+        )), table)
+
+    def parts(self):
+        return self.disjuncts
+
+    def expression(self, args, parts):
+        if not parts:
+            return "False"
+        return "(" + " or ".join(parts) + ")"
+
+    def bitwise_expression(self, args, parts):
+        if not parts:
+            return "(~_ones)"
+        return "(" + " | ".join(parts) + ")"
+
+    def encode(self, cnf):
+        literals = [cnf.literal(disjunct) for disjunct in self.disjuncts]
+        x = cnf.new_variable()
+        for literal in literals:
+            cnf.clauses.append([x, -literal])
+        cnf.clauses.append([-x] + literals)
+        return x
+
+    def distribute(self, cnf, negated=False):
+        parts = [disjunct.distribute(cnf, negated)
+                 for disjunct in self.disjuncts]
+        return conjoin(parts) if negated else disjoin(parts)
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
+        super().__init__()
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -183,28 +570,86 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
+        if self._symbols is not None:
+            return set(self._symbols)
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
+    def simplify(self):
+        return Or(Not(self.antecedent), self.consequent).simplify()
+
+    def interned(self, table=None):
+        if self._hash is not None:
+            return self
+        table = {} if table is None else table
+        return Sentence.share(Implication(
+            self.antecedent.interned(table), self.consequent.interned(table)
+        ), table)
+
+    def parts(self):
+        return (self.antecedent, self.consequent)
+
+    def expression(self, args, parts):
+        antecedent, consequent = parts
+        return f"(not {antecedent} or {consequent})"
+
+    def bitwise_expression(self, args, parts):
+        antecedent, consequent = parts
+        return f"(~{antecedent} | {consequent})"
+
+    def encode(self, cnf):
+        antecedent = cnf.literal(self.antecedent)
+        consequent = cnf.literal(self.consequent)
+        x = cnf.new_variable()
+        cnf.clauses += [
+            [-x, -antecedent, consequent],
+            [x, antecedent],
+            [x, -consequent],
+        ]
+        return x
+
+    def distribute(self, cnf, negated=False):
+        parts = [self.antecedent.distribute(cnf, not negated),
+                 self.consequent.distribute(cnf, negated)]
+        return conjoin(parts) if negated else disjoin(parts)
+
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
+        super().__init__()
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional)
+            and self.left == other.left
+            and self.right == other.right
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -216,48 +661,666 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
     def symbols(self):
+        if self._symbols is not None:
+            return set(self._symbols)
         return set.union(self.left.symbols(), self.right.symbols())
 
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    def simplify(self):
+        left = self.left.simplify()
+        right = self.right.simplify()
+        if left == right:
+            return And()
+        if Not(left).simplify() == right:
+            return Or()
+        # Rewriting in terms of And and Or would evaluate both sides twice,
+        # so only biconditionals with a constant side are rewritten
+        for constant, other in ((left, right), (right, left)):
+            if isinstance(constant, And) and not constant.conjuncts:
+                return other
+            if isinstance(constant, Or) and not constant.disjuncts:
+                return Not(other).simplify()
+        return Biconditional(left, right)
+
+    def interned(self, table=None):
+        if self._hash is not None:
+            return self
+        table = {} if table is None else table
+        return Sentence.share(Biconditional(
+            self.left.interned(table), self.right.interned(table)
+        ), table)
+
+    def parts(self):
+        return (self.left, self.right)
+
+    def expression(self, args, parts):
+        left, right = parts
+        return f"((not {left}) == (not {right}))"
+
+    def bitwise_expression(self, args, parts):
+        left, right = parts
+        return f"(~({left} ^ {right}))"
+
+    def encode(self, cnf):
+        left = cnf.literal(self.left)
+        right = cnf.literal(self.right)
+        x = cnf.new_variable()
+        cnf.clauses += [
+            [-x, -left, right],
+            [-x, left, -right],
+            [x, left, right],
+            [x, -left, -right],
+        ]
+        return x
+
+    def distribute(self, cnf, negated=False):
+        # Equivalent to (¬left ∨ right) ∧ (left ∨ ¬right), and its negation
+        # to (left ∨ right) ∧ (¬left ∨ ¬right)
+        left, not_left = (self.left.distribute(cnf, negation)
+                          for negation in (False, True))
+        right, not_right = (self.right.distribute(cnf, negation)
+                            for negation in (negated, not negated))
+        return conjoin([disjoin([not_left, right]),
+                        disjoin([left, not_right])])
+
+
+class CNF():
+    """
+    Clauses in conjunctive normal form, as lists of nonzero ints where `v`
+    is variable `v` and `-v` its negation.
+
+    Sentences are added with the Tseitin encoding by default: each
+    compound subsentence gets a new variable defined to be equivalent to
+    it, so the clauses grow linearly with the sentences instead of
+    exponentially, and are satisfiable exactly when the sentences are.
+
+    `variables` maps symbol names to their variables.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.count = 0
+        self.clauses = []
+        self.literals = {}
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable of a symbol name, adding it if new."""
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to a sentence, encoding it first if
+        the same sentence has not been encoded before.
+        """
+        if sentence not in self.literals:
+            self.literals[sentence] = sentence.encode(self)
+        return self.literals[sentence]
+
+    def add(self, sentence, tseitin=True):
+        """
+        Adds clauses requiring a sentence to be true. Conjunctions and
+        disjunctions at the top become clauses directly, without new
+        variables.
+
+        Without `tseitin`, adds clauses equivalent to the sentence over
+        its symbols only instead.
+        """
+        if not tseitin:
+            self.clauses += sentence.distribute(self)
+        elif isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Not) and isinstance(sentence.operand, Or):
+            for disjunct in sentence.operand.disjuncts:
+                self.add(Not(disjunct))
+        elif isinstance(sentence, Not) and isinstance(sentence.operand, Not):
+            self.add(sentence.operand.operand)
         else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+            self.clauses.append([self.literal(sentence)])
+
+    def dimacs(self):
+        """Returns the clauses in the DIMACS format read by SAT solvers."""
+        lines = [f"p cnf {self.count} {len(self.clauses)}"]
+        lines += [f"c {variable} {name}"
+                  for name, variable in self.variables.items()]
+        lines += [" ".join(map(str, clause)) + " 0" for clause in self.clauses]
+        return "\n".join(lines) + "\n"
+
+
+def simplify_parts(parts, cls):
+    """
+    Simplifies the parts of an And or Or (`cls`): parts of the same class
+    are flattened into it, which also drops empty ones as they cannot
+    change the whole, and duplicates removed. Returns None if the whole
+    is decided instead, by an empty part of the other class or by two
+    parts contradicting each other.
+    """
+    simplified = {}
+    for part in parts:
+        part = part.simplify()
+        if isinstance(part, cls):
+            simplified.update(dict.fromkeys(operands(part)))
+        elif isinstance(part, (And, Or)) and not operands(part):
+            return None
+        else:
+            simplified[part] = None
+    for part in simplified:
+        if isinstance(part, Not) and part.operand in simplified:
+            return None
+    return list(simplified)
+
+
+def postorder(sentence):
+    """
+    Yields each distinct node of `sentence` once, after its parts,
+    without recursing.
+    """
+    seen = set()
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+        elif id(node) not in seen:
+            seen.add(id(node))
+            stack.append((node, True))
+            stack.extend((part, False) for part in reversed(node.parts()))
+
+
+def operands(sentence):
+    """Returns the conjuncts of an And or the disjuncts of an Or."""
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    return sentence.disjuncts
+
+
+def conjoin(parts):
+    """Returns the conjunction of lists of clauses."""
+    return [clause for clauses in parts for clause in clauses]
+
+
+def disjoin(parts):
+    """
+    Returns the disjunction of lists of clauses, as one clause for each
+    way of picking a clause from every list, dropping those always true.
+    """
+    result = [[]]
+    for clauses in parts:
+        combined = []
+        for clause in result:
+            for other in clauses:
+                literals = list(dict.fromkeys(clause + other))
+                if not any(-literal in literals for literal in literals):
+                    combined.append(literals)
+        result = combined
+    return result
+
+
+def model_check(knowledge, query, method="backtrack", stats=None,
+                simplify=False):
+    """
+    Checks if knowledge base entails query.
+
+    `method` is "backtrack" to assign symbols one at a time, skipping
+    every model extending a partial one that already decides the answer
+    (see backtrack_check), "enumerate" to check every model, "vectorized"
+    to check many models at once with NumPy (see vectorized_check),
+    "parallel" to backtrack on every CPU (see parallel_check), or "sat"
+    to show that the knowledge base and the negated query cannot both
+    be true with a SAT solver, which is not exponential in the number of
+    symbols for typical puzzles.
+
+    If `stats` is a dict, the enumerating methods count the models, or
+    partial models, they examine in `stats["nodes"]`.
+
+    With `simplify`, both sentences are simplified first (see
+    Sentence.simplify), which costs about as much as checking small
+    puzzles; to check many queries, simplify the knowledge base once
+    and pass the result instead.
+    """
+    if simplify:
+        knowledge = prepare(knowledge)
+        query = prepare(query)
+
+    if method == "sat":
+        cnf = CNF()
+        cnf.add(knowledge)
+        query = cnf.literal(query)
+        return not Solver(cnf.clauses).solve([-query])
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(knowledge.frozen_symbols() | query.frozen_symbols())
+
+    if stats is None:
+        stats = {}
+    stats["nodes"] = 0
+
+    if method == "backtrack":
+        return backtrack_check(knowledge, query, symbols, stats)
+    if method == "vectorized":
+        stats["nodes"] = 2 ** len(symbols)
+        return vectorized_check(knowledge, query, symbols)
+    if method == "parallel":
+        return parallel_check(knowledge, query, symbols, stats)
+    if method != "enumerate":
+        raise ValueError(f"unknown model checking method {method!r}")
+
+    # Compile both sentences to functions of the symbols' truth values
+    return enumerate_check(knowledge.compile(symbols), query.compile(symbols),
+                           len(symbols), stats)
+
+
+def prepare(sentence):
+    """
+    Simplifies a sentence for checking. Sentences nested too deeply to
+    simplify are checked as they are.
+    """
+    try:
+        return sentence.simplify()
+    except RecursionError:
+        return sentence
+
+
+def enumerate_check(knowledge, query, count, stats, prefix=()):
+    """
+    Checks if knowledge base entails query, both compiled, in every model
+    of `count` symbols starting with the values in `prefix`.
+    """
+    # In every model where the knowledge base is true, the query must be too
+    for rest in itertools.product((True, False), repeat=count - len(prefix)):
+        stats["nodes"] += 1
+        model = prefix + rest if prefix else rest
+        if knowledge(*model) and not query(*model):
+            return False
+    return True
+
+
+def backtrack_check(knowledge, query, symbols, stats, model=None):
+    """
+    Checks if knowledge base entails query by assigning `symbols` in order,
+    in one model updated in place and undone on backtracking. `model` may
+    assign other symbols beforehand.
+
+    After each assignment both sentences are evaluated on the partial
+    model, and the models extending it are skipped once the knowledge
+    base is false or the query true in all of them, or a counterexample
+    is found once the knowledge base is true and the query false.
+    """
+    if model is None:
+        model = {}
+    # Symbols assigned so far, in order, so assignments can be undone
+    trail = []
+
+    def check_all():
+        """Checks if entailment holds in every extension of the model."""
+        stats["nodes"] += 1
+        holds = knowledge.evaluate_partial(model)
+        if holds is False:
+            return True
+        entailed = query.evaluate_partial(model)
+        if entailed is True:
+            return True
+        if entailed is False and holds is True:
+            return False
+
+        p = symbols[len(trail)]
+        trail.append(p)
+        for value in (True, False):
+            model[p] = value
+            if not check_all():
+                return False
+        del model[trail.pop()]
+        return True
+
+    return check_all()
+
+
+def parallel_check(knowledge, query, symbols, stats, workers=None,
+                   method="backtrack"):
+    """
+    Checks if knowledge base entails query on a pool of `workers`
+    processes, one per CPU by default. The models are split into cubes,
+    one for each assignment of the first few `symbols`, which workers
+    check with `method` ("backtrack" or "enumerate"). All workers are
+    stopped as soon as one finds a counterexample.
+    """
+    workers = workers or os.cpu_count() or 1
+    with worker_pool(workers, (knowledge, query, symbols, method)) as pool:
+        for holds, nodes in pool.imap_unordered(check_cube,
+                                                cubes(symbols, workers)):
+            stats["nodes"] += nodes
+            if not holds:
+                # Leaving the pool terminates the workers still checking
+                return False
+    return True
+
+
+def worker_pool(workers, job):
+    """
+    Returns a pool of `workers` processes, each started with `job`: the
+    arguments of a check (see start_worker).
+    """
+    # Forked workers share the sentences instead of unpickling copies
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    return context.Pool(workers, initializer=start_worker, initargs=job)
+
+
+def cubes(symbols, workers):
+    """
+    Returns the cubes to split the models of `symbols` into for `workers`
+    processes: every assignment of the first few symbols.
+    """
+    prefix = min(len(symbols), (CUBES_PER_WORKER * workers - 1).bit_length())
+    return itertools.product((True, False), repeat=prefix)
+
+
+def start_worker(knowledge, query, symbols, method):
+    """
+    Prepares a worker process of parallel_check, or of parallel_possible
+    when `method` is "possible" and `query` a list of queries.
+    """
+    global worker_job
+    if method == "enumerate":
+        knowledge = knowledge.compile(symbols)
+        query = query.compile(symbols)
+    elif method not in ("backtrack", "possible"):
+        raise ValueError(f"unknown model checking method {method!r}")
+    worker_job = (knowledge, query, symbols, method)
+
+
+def check_cube(cube):
+    """
+    Checks entailment in the models starting with the values in `cube`,
+    returning whether it holds and the models examined; run in a worker.
+    """
+    knowledge, query, symbols, method = worker_job
+    stats = {"nodes": 0}
+    if method == "enumerate":
+        holds = enumerate_check(knowledge, query, len(symbols), stats, cube)
+    else:
+        holds = backtrack_check(knowledge, query, symbols[len(cube):], stats,
+                                dict(zip(symbols, cube)))
+    return holds, stats["nodes"]
+
+
+def vectorized_check(knowledge, query, symbols):
+    """
+    Checks if knowledge base entails query over `symbols`, evaluating
+    both on every model at once as bit-packed NumPy arrays (see
+    bit_models).
+    """
+    knowledge = knowledge.compile(symbols, bitwise=True)
+    query = query.compile(symbols, bitwise=True)
+    for ones, mask, args in bit_models(symbols):
+        # Any model where the knowledge base holds but the query does not
+        # is a counterexample
+        if (knowledge(ones, *args) & ~query(ones, *args) & mask).any():
+            return False
+    return True
+
+
+def bit_models(symbols):
+    """
+    Yields every model of `symbols` as bit-packed NumPy arrays, a chunk
+    at a time, for sentences compiled with `bitwise`. Each chunk is a
+    value with all bits set, a mask of the bits that are models, and the
+    arguments for the symbols.
+
+    Model `i` assigns each symbol `symbols[j]` the value of bit `j` of `i`,
+    and is stored as bit `i % WORD_BITS` of word `i // WORD_BITS`. The first
+    symbols thus have the same pattern in every word, the next CHUNK_BITS
+    vary from word to word within a chunk, and any more are constant over
+    a chunk, so large numbers of symbols are checked one chunk at a time.
+    """
+    # NumPy is only needed for vectorized checking
+    import numpy as np
+
+    ones = np.uint64(2 ** WORD_BITS - 1)
+    zeros = np.uint64(0)
+    in_word = WORD_BITS.bit_length() - 1
+    in_chunk = min(CHUNK_BITS, max(0, len(symbols) - in_word))
+    words = 1 << in_chunk
+    chunks = 1 << max(0, len(symbols) - in_word - in_chunk)
+
+    # Bit patterns of the symbols that vary within each word
+    models = np.arange(WORD_BITS, dtype=np.uint64)
+    values = [
+        np.bitwise_or.reduce(((models >> np.uint64(j)) & np.uint64(1)) << models)
+        for j in range(min(in_word, len(symbols)))
+    ]
+    # With fewer symbols than that, only the first 2 ** n bits are models
+    mask = ones if len(symbols) >= in_word else np.uint64(2 ** 2 ** len(symbols) - 1)
+
+    # Symbols that vary from word to word within each chunk
+    index = np.arange(words, dtype=np.uint64)
+    values += [
+        ((index >> np.uint64(j)) & np.uint64(1)) * ones
+        for j in range(in_chunk)
+    ]
+
+    for chunk in range(chunks):
+        constant = [
+            ones if chunk >> j & 1 else zeros
+            for j in range(len(symbols) - len(values))
+        ]
+        yield ones, mask, values + constant
+
+
+def entailments(knowledge, queries, method="backtrack", simplify=False):
+    """
+    Checks which of `queries` the knowledge base entails, and which it
+    refutes (entails the negation of), in a single pass over the models
+    or a single SAT solver session, instead of one model_check each.
+    `method` and `simplify` are as for model_check.
+
+    Returns two lists, of the queries entailed and the queries refuted,
+    in the order given. If the knowledge base cannot be true at all, it
+    both entails and refutes every query.
+    """
+    queries = list(queries)
+    simplified = queries
+    if simplify:
+        knowledge = prepare(knowledge)
+        simplified = [prepare(query) for query in queries]
+    if method == "sat":
+        possible = sat_possible(knowledge, simplified)
+    else:
+        symbols = sorted(knowledge.frozen_symbols().union(
+            *(query.frozen_symbols() for query in simplified)
+        ))
+        if method == "backtrack":
+            possible = backtrack_possible(knowledge, simplified, symbols)
+        elif method == "vectorized":
+            possible = vectorized_possible(knowledge, simplified, symbols)
+        elif method == "enumerate":
+            possible = enumerate_possible(knowledge, simplified, symbols)
+        elif method == "parallel":
+            possible = parallel_possible(knowledge, simplified, symbols)
+        else:
+            raise ValueError(f"unknown model checking method {method!r}")
+
+    entailed = [query for query, (_, false) in zip(queries, possible)
+                if not false]
+    refuted = [query for query, (true, _) in zip(queries, possible)
+               if not true]
+    return entailed, refuted
+
+
+class Possible(list):
+    """
+    For each of a list of queries, a [true, false] pair of whether some
+    model of the knowledge base makes it true, and makes it false.
+    `unsettled` holds the indices of queries not yet known to be both.
+    """
+
+    def __init__(self, count):
+        super().__init__([False, False] for _ in range(count))
+        self.unsettled = set(range(count))
+
+    def record(self, i, value):
+        """Records that query `i` has `value` in a model of the knowledge base."""
+        pair = self[i]
+        pair[0 if value else 1] = True
+        if pair[0] and pair[1]:
+            self.unsettled.discard(i)
+
+
+def enumerate_possible(knowledge, queries, symbols):
+    knowledge = knowledge.compile(symbols)
+    functions = [query.compile(symbols) for query in queries]
+    possible = Possible(len(queries))
+    for model in itertools.product((True, False), repeat=len(symbols)):
+        if not knowledge(*model):
+            continue
+        for i in list(possible.unsettled):
+            possible.record(i, functions[i](*model))
+        if not possible.unsettled:
+            break
+    return possible
+
+
+def backtrack_possible(knowledge, queries, symbols, model=None):
+    """
+    Like backtrack_check, skipping models extending a partial model where
+    the knowledge base is false, or where it is true and every query not
+    yet settled has a value.
+    """
+    possible = Possible(len(queries))
+    if model is None:
+        model = {}
+    # Symbols assigned so far, in order, so assignments can be undone
+    trail = []
+
+    def search():
+        """Returns True once every query is settled."""
+        holds = knowledge.evaluate_partial(model)
+        if holds is False:
+            return False
+        undecided = False
+        for i in list(possible.unsettled):
+            value = queries[i].evaluate_partial(model)
+            if value is None:
+                undecided = True
+            elif holds:
+                possible.record(i, value)
+        if not possible.unsettled:
+            return True
+        if holds and not undecided:
+            return False
+
+        p = symbols[len(trail)]
+        trail.append(p)
+        for value in (True, False):
+            model[p] = value
+            if search():
+                return True
+        del model[trail.pop()]
+        return False
+
+    search()
+    return possible
+
+
+def parallel_possible(knowledge, queries, symbols, workers=None):
+    """
+    Like parallel_check, running backtrack_possible on each cube and
+    stopping all workers once every query is settled.
+    """
+    workers = workers or os.cpu_count() or 1
+    possible = Possible(len(queries))
+    with worker_pool(workers, (knowledge, queries, symbols, "possible")) as pool:
+        for pairs in pool.imap_unordered(possible_cube,
+                                         cubes(symbols, workers)):
+            for i, (true, false) in enumerate(pairs):
+                if true:
+                    possible.record(i, True)
+                if false:
+                    possible.record(i, False)
+            if not possible.unsettled:
+                # Leaving the pool terminates the workers still checking
+                break
+    return possible
+
+
+def possible_cube(cube):
+    """
+    Returns the [true, false] pairs of backtrack_possible over the models
+    starting with the values in `cube`; run in a worker.
+    """
+    knowledge, queries, symbols, _ = worker_job
+    return list(backtrack_possible(knowledge, queries, symbols[len(cube):],
+                                   dict(zip(symbols, cube))))
+
+
+def vectorized_possible(knowledge, queries, symbols):
+    knowledge = knowledge.compile(symbols, bitwise=True)
+    functions = [query.compile(symbols, bitwise=True) for query in queries]
+    possible = Possible(len(queries))
+    for ones, mask, args in bit_models(symbols):
+        holds = knowledge(ones, *args) & mask
+        if not holds.any():
+            continue
+        for i in list(possible.unsettled):
+            values = functions[i](ones, *args)
+            if (holds & values).any():
+                possible.record(i, True)
+            if (holds & ~values).any():
+                possible.record(i, False)
+        if not possible.unsettled:
+            break
+    return possible
+
+
+def sat_possible(knowledge, queries):
+    """
+    Asks one SAT solver, which keeps the clauses it learns between calls,
+    for a model making each query true and one making it false, skipping
+    any already found as part of an earlier model.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    literals = [cnf.literal(query) for query in queries]
+    solver = Solver(cnf.clauses)
+    # Queries may mention symbols the knowledge base does not
+    solver.reserve(literals)
+    possible = Possible(len(queries))
+
+    def record():
+        for i, literal in enumerate(literals):
+            possible.record(i, solver.model[abs(literal)] == (literal > 0))
+
+    if not solver.solve():
+        return possible
+    record()
+    for i, literal in enumerate(literals):
+        for value, assumption in ((True, literal), (False, -literal)):
+            if not possible[i][0 if value else 1] and solver.solve([assumption]):
+                record()
+    return possible
@@ -85,9 +85,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
-                    print(f"    {symbol}")
+            entailed, _ = entailments(knowledge, symbols)
+            for symbol in entailed:
+                print(f"    {symbol}")
 
 
 if __name__ == "__main__":
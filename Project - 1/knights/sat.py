@@ -0,0 +1,304 @@
+import heapq
+
+# Activity added to variables in each conflict grows by this factor,
+# so recent conflicts count for more
+ACTIVITY_GROWTH = 1 / 0.95
+
+# Activities are scaled down once any exceeds this
+ACTIVITY_LIMIT = 1e100
+
+# Conflicts before the first restart, multiplied by the Luby sequence
+RESTART_BASE = 100
+
+
+class Solver():
+    """
+    CDCL satisfiability solver over clauses in DIMACS style: lists of
+    nonzero ints, where `v` is variable `v` and `-v` its negation.
+
+    Propagation watches two literals per clause, conflicts are analyzed
+    to the first unique implication point and learned as new clauses,
+    and branching picks the most active variable with its saved phase.
+
+    Clauses can be added between calls to solve, and solve can assume
+    literals true for one call, so one solver answers many related
+    queries while keeping what it has learned.
+    """
+
+    def __init__(self, clauses=()):
+        self.variables = 0
+        # Indexed by variable: 1 if true, -1 if false, 0 if unassigned
+        self.assigns = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [False]
+        self.activity = [0.0]
+        self.increment = 1.0
+        self.heap = []
+        # Indexed by literal index: clauses watching that literal
+        self.watches = [[], []]
+        self.trail = []
+        self.trail_limits = []
+        self.propagated = 0
+        self.conflicts = 0
+        self.model = None
+        # False once the clauses are unsatisfiable regardless of assumptions
+        self.ok = True
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def new_variable(self):
+        """Adds a variable and returns it."""
+        self.variables += 1
+        self.assigns.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.phases.append(False)
+        self.activity.append(0.0)
+        self.watches += [[], []]
+        heapq.heappush(self.heap, (0.0, self.variables))
+        return self.variables
+
+    def add_clause(self, clause):
+        """
+        Adds a clause, returning False if the clauses are now known to be
+        unsatisfiable.
+        """
+        self.cancel_until(0)
+        if not self.ok:
+            return False
+        self.reserve(clause)
+
+        literals = []
+        for literal in set(clause):
+            value = self.value(literal)
+            if value == 1 or -literal in literals:
+                # Already satisfied or always true
+                return True
+            if value == 0:
+                literals.append(literal)
+
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.enqueue(literals[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(literals)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns whether the clauses are satisfiable with all `assumptions`
+        true. If so, `model` maps each variable to its value.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.reserve(assumptions)
+        restarts = 0
+        limit = RESTART_BASE * luby(restarts)
+        conflicts = 0
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.cancel_until(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.attach(learned)
+                    self.enqueue(learned[0], learned)
+                self.increment *= ACTIVITY_GROWTH
+                continue
+
+            if conflicts >= limit:
+                restarts += 1
+                limit = RESTART_BASE * luby(restarts)
+                conflicts = 0
+                self.cancel_until(0)
+                continue
+
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value == -1:
+                    # The assumptions contradict the clauses
+                    self.cancel_until(0)
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value == 0:
+                    self.enqueue(literal, None)
+                continue
+
+            variable = self.pick_branch()
+            if variable is None:
+                self.model = [value == 1 for value in self.assigns]
+                self.cancel_until(0)
+                return True
+            self.trail_limits.append(len(self.trail))
+            self.enqueue(variable if self.phases[variable] else -variable, None)
+
+    def reserve(self, literals):
+        """Adds any variables of `literals` not added yet."""
+        for literal in literals:
+            while abs(literal) > self.variables:
+                self.new_variable()
+
+    def value(self, literal):
+        """Returns 1 if a literal is true, -1 if false and 0 if unassigned."""
+        if literal > 0:
+            return self.assigns[literal]
+        return -self.assigns[-literal]
+
+    def attach(self, clause):
+        """Watches the first two literals of a clause."""
+        self.watches[index(clause[0])].append(clause)
+        self.watches[index(clause[1])].append(clause)
+
+    def enqueue(self, literal, reason):
+        """Makes a literal true, implied by `reason` or else decided."""
+        variable = abs(literal)
+        self.assigns[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns literals implied by unit clauses until none are left,
+        returning a clause made false if there is a conflict.
+        """
+        assigns = self.assigns
+        while self.propagated < len(self.trail):
+            false = -self.trail[self.propagated]
+            self.propagated += 1
+            watching = self.watches[index(false)]
+            kept = []
+            for i, clause in enumerate(watching):
+                # Keep the false literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                if (assigns[first] if first > 0 else -assigns[-first]) == 1:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if (assigns[other] if other > 0 else -assigns[-other]) != -1:
+                        clause[1], clause[k] = other, false
+                        self.watches[index(other)].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if (assigns[first] if first > 0 else -assigns[-first]) == -1:
+                        kept.extend(watching[i + 1:])
+                        self.watches[index(false)] = kept
+                        self.propagated = len(self.trail)
+                        return clause
+                    self.enqueue(first, clause)
+            self.watches[index(false)] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives a learned clause from a conflict, whose first literal is
+        the negated first unique implication point, and returns it with
+        the level to backjump to.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        i = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for other in (clause if literal is None else clause[1:]):
+                variable = abs(other)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+            # Walk back to the most recent literal involved
+            while abs(self.trail[i]) not in seen:
+                i -= 1
+            literal = self.trail[i]
+            i -= 1
+            variable = abs(literal)
+            seen.discard(variable)
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[variable]
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal assigned last after the asserting literal
+        j = max(range(1, len(learned)),
+                key=lambda j: self.levels[abs(learned[j])])
+        learned[1], learned[j] = learned[j], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > ACTIVITY_LIMIT:
+            self.activity = [a / ACTIVITY_LIMIT for a in self.activity]
+            self.increment /= ACTIVITY_LIMIT
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, self.variables + 1)
+                         if not self.assigns[v]]
+            heapq.heapify(self.heap)
+
+    def pick_branch(self):
+        """Returns the most active unassigned variable, or None."""
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if not self.assigns[variable]:
+                return variable
+        return None
+
+    def cancel_until(self, level):
+        """Undoes all assignments above decision level `level`."""
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.assigns[variable] = 0
+            self.reasons[variable] = None
+            self.phases[variable] = literal > 0
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.propagated = start
+
+
+def index(literal):
+    """Returns the position of a literal in the watch lists."""
+    return 2 * literal if literal > 0 else -2 * literal + 1
+
+
+def luby(i):
+    """Returns term `i` of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ..."""
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power -= 1
+        i %= size
+    return 2 ** power